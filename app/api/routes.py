@@ -1,6 +1,13 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, formatdate
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
+import asyncio
+import hashlib
+import io
 import json
+import logging
 import os
 import re
 import secrets
@@ -13,68 +20,240 @@ import uuid
 import platform
 import tarfile
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from fastapi import APIRouter, Request, Query, BackgroundTasks, Form, UploadFile, File, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, PlainTextResponse
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import APIRouter, Depends, Request, Query, Form, UploadFile, File, HTTPException
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, PlainTextResponse, Response
 from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import escape
 from pydantic import BaseModel
 import httpx
+import orjson
 import sys
 
-try:
-    from minecraft_launcher_lib import install as mll_install
-    from minecraft_launcher_lib import command as mll_command
-except Exception:  # ImportError or other
-    mll_install = None
-    mll_command = None
-try:
-    from minecraft_launcher_lib import exceptions as mll_exc
-except Exception:
-    mll_exc = None
-try:
-    from minecraft_launcher_lib.fabric import install_fabric as mll_install_fabric
-except Exception:
-    mll_install_fabric = None
-try:
-    from minecraft_launcher_lib.quilt import install_quilt as mll_install_quilt
-except Exception:
-    mll_install_quilt = None
-try:
-    from minecraft_launcher_lib.forge import install_forge_version as mll_install_forge
-except Exception:
-    mll_install_forge = None
-try:
-    from minecraft_launcher_lib.neoforge import install_neoforge_version as mll_install_neoforge
-except Exception:
-    mll_install_neoforge = None
+# minecraft-launcher-lib is heavy and optional, so it is imported on first use
+# (launch or auth) instead of at startup; see _load_mll(). Missing parts stay None.
+mll_install = None
+mll_command = None
+mll_exc = None
+ms_account = None
+mll_install_fabric = None
+mll_install_quilt = None
+mll_install_forge = None
+mll_install_neoforge = None
+_MLL_LOADED = False
+_MLL_LOCK = threading.Lock()
+
+
+def _load_mll() -> None:
+    """Import minecraft-launcher-lib into the module globals above, once."""
+    global _MLL_LOADED, mll_install, mll_command, mll_exc, ms_account
+    global mll_install_fabric, mll_install_quilt, mll_install_forge, mll_install_neoforge
+    if _MLL_LOADED:
+        return
+    with _MLL_LOCK:
+        if _MLL_LOADED:
+            return
+        try:
+            from minecraft_launcher_lib import install as mll_install
+            from minecraft_launcher_lib import command as mll_command
+        except Exception:  # ImportError or other
+            pass
+        try:
+            from minecraft_launcher_lib import exceptions as mll_exc
+        except Exception:
+            pass
+        try:
+            from minecraft_launcher_lib import microsoft_account as ms_account
+        except Exception:
+            pass
+        try:
+            from minecraft_launcher_lib.fabric import install_fabric as mll_install_fabric
+        except Exception:
+            pass
+        try:
+            from minecraft_launcher_lib.quilt import install_quilt as mll_install_quilt
+        except Exception:
+            pass
+        try:
+            from minecraft_launcher_lib.forge import install_forge_version as mll_install_forge
+        except Exception:
+            pass
+        try:
+            from minecraft_launcher_lib.neoforge import install_neoforge_version as mll_install_neoforge
+        except Exception:
+            pass
+        _MLL_LOADED = True
 
 from app.config import get_settings
-from app.services.modrinth import ModrinthClient
+from app.services.http_cache import etag_matches, not_modified_since
+from app.services.modrinth import HTTP2_AVAILABLE, ModrinthClient
 
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Fixed for the life of the process; read once instead of per request
+USER_AGENT = get_settings().modrinth_user_agent
+
+
+def get_modrinth(request: Request) -> ModrinthClient:
+    """Return the shared ModrinthClient created in the app lifespan."""
+    return request.app.state.modrinth
+
+
+# Browser cache lifetimes; they mirror the ModrinthClient TTLs for the same data
+SEARCH_CACHE_TTL = 60
+PROJECT_CACHE_TTL = 300
+
+
+def _cache_headers(max_age: int) -> dict:
+    """Headers letting browsers and proxies reuse a page for `max_age` seconds."""
+    return {
+        "Cache-Control": f"public, max-age={max_age}",
+        # HTMX partials differ from full page loads for the same URL
+        "Vary": "HX-Request",
+        "Expires": formatdate(time.time() + max_age, usegmt=True),
+    }
+
+
 # Resolve templates directory; handle PyInstaller onefile via sys._MEIPASS
 if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
-    TEMPLATES_DIR = Path(sys._MEIPASS) / "app" / "templates"
+    TEMPLATES_DIR = os.path.join(sys._MEIPASS, "app", "templates")
 else:
-    TEMPLATES_DIR = Path(__file__).resolve().parents[1] / "templates"
-templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+    # abspath is pure string work; resolve() would stat every path component
+    TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates")
+templates = Jinja2Templates(directory=TEMPLATES_DIR)
+# Only dev mode needs Jinja's per-render mtime checks
+templates.env.auto_reload = get_settings().dev_mode
+# Keep compiled templates between runs; entries are keyed by a checksum of the source
+try:
+    _JINJA_CACHE_DIR = Path.home() / ".cottage_launcher" / "jinja_cache"
+    _JINJA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    templates.env.bytecode_cache = FileSystemBytecodeCache(str(_JINJA_CACHE_DIR))
+except OSError:
+    pass
+
+_TEMPLATE_NAMES = (
+    "browse.html",
+    "modpacks.html",
+    "installed.html",
+    "settings.html",
+    "components/project_list.html",
+    "modpack_detail.html",
+    "instance_catalog.html",
+    "instance_manage.html",
+)
+_TEMPLATES = {name: templates.env.get_template(name) for name in _TEMPLATE_NAMES}
+
+
+def render(name: str, context: dict, headers: Optional[dict] = None) -> HTMLResponse:
+    """Render a preloaded template straight into an HTMLResponse."""
+    template = templates.env.get_template(name) if templates.env.auto_reload else _TEMPLATES[name]
+    return HTMLResponse(template.render(context), headers=headers)
+
+
+# Fixed HTMX fragments, UTF-8 encoded once at import
+_HTML_JOB_NOT_FOUND = b'<div class="text-red-400 text-sm">Job not found.</div>'
+_HTML_NEED_JAR = b'<div class="text-red-400 text-sm">Please upload a .jar file.</div>'
+_HTML_NEED_ZIP_OR_JAR = b'<div class="text-red-400 text-sm">Please upload a .zip or .jar file.</div>'
+_HTML_NEED_ZIP = b'<div class="text-red-400 text-sm">Please upload a .zip file.</div>'
+_HTML_NO_WORLDS = b'<select id="world-select" class="w-full px-2 py-1.5 rounded bg-slate-900 border border-slate-800 text-sm"><option value="">No worlds found</option></select>'
+_HTML_SELECT_WORLD = b'<div class="text-slate-400 text-sm">Select a world to view datapacks.</div>'
+_HTML_RESOURCEPACK_ADDED = b'<div class="text-emerald-400 text-sm">Resource pack added.</div>'
+_HTML_RESOURCEPACK_FAILED = b'<div class="text-red-400 text-sm">Failed to add resource pack.</div>'
+_HTML_SHADERPACK_ADDED = b'<div class="text-emerald-400 text-sm">Shader pack added.</div>'
+_HTML_SHADERPACK_FAILED = b'<div class="text-red-400 text-sm">Failed to add shader pack.</div>'
+_HTML_DATAPACK_ADDED = b'<div class="text-emerald-400 text-sm">Data pack added.</div>'
+_HTML_DATAPACK_FAILED = b'<div class="text-red-400 text-sm">Failed to add data pack.</div>'
+_HTML_NO_COMPATIBLE = b'<div class="text-red-400 text-sm">No compatible files found.</div>'
+_HTML_NO_JAR = b'<div class="text-red-400 text-sm">No downloadable jar found.</div>'
+_HTML_MOD_ADDED = b'<div class="text-emerald-400 text-sm">Mod added.</div>'
 
 # Simple in-memory job tracking and instance directory
 JOBS: dict[str, dict] = {}
+# Finished jobs are kept this long for late status polls, then dropped
+JOB_RETENTION = 600.0
+
+
+def _new_job() -> str:
+    """Register a queued job (pruning long-finished ones) and return its id."""
+    now = time.monotonic()
+    for jid in [jid for jid, job in JOBS.items() if now - job.get("finished_at", now) > JOB_RETENTION]:
+        JOBS.pop(jid, None)
+    job_id = secrets.token_hex(8)
+    JOBS[job_id] = {"status": "queued", "progress": 0, "message": "Queued"}
+    return job_id
+
+# Long-running jobs get dedicated threads so they cannot starve the pool that
+# serves sync request handlers. Installs are mostly network/disk bound; launches
+# are short bursts of prep work before the game process is spawned.
+INSTALL_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cottage-install")
+LAUNCH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cottage-launch")
+# Independent launch preflight steps (JRE setup, library pruning) run here while
+# the launch thread carries on with auth and version installs
+PREFLIGHT_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cottage-preflight")
+
+
+def _submit_job(pool: ThreadPoolExecutor, job_id: str, fn, *args) -> None:
+    """Run `fn(job_id, *args)` on `pool`; an exception it doesn't handle itself fails the job."""
+    def _done(fut) -> None:
+        if fut.cancelled():
+            JOBS.get(job_id, {}).update(status="failed", message="Cancelled", finished_at=time.monotonic())
+            return
+        exc = fut.exception()
+        if exc is not None:
+            logger.error("[Jobs] %s crashed: %r", fn.__name__, exc)
+            JOBS.get(job_id, {}).update(status="failed", message=str(exc), finished_at=time.monotonic())
+
+    pool.submit(fn, job_id, *args).add_done_callback(_done)
+
+
+def _log_preflight_error(fut) -> None:
+    """Done callback for preflight work whose launch failed before it collected the result."""
+    exc = None if fut.cancelled() else fut.exception()
+    if exc is not None:
+        logger.warning("[Launch] Preflight step failed: %r", exc)
+
+
+def shutdown_job_pools() -> None:
+    """Stop taking new jobs and drop queued ones; running jobs finish in their threads."""
+    for pool in (INSTALL_POOL, LAUNCH_POOL, PREFLIGHT_POOL):
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
 INSTANCES_DIR = Path.home() / ".cottage_launcher" / "instances"
 INSTANCES_DIR.mkdir(parents=True, exist_ok=True)
 MC_DIR = Path.home() / ".cottage_launcher" / "minecraft"
 MC_DIR.mkdir(parents=True, exist_ok=True)
+# Resolved Temurin download links, keyed "feature/os/arch" -> [link, filename, expires_at]
+ADOPTIUM_CACHE_FILE = Path.home() / ".cottage_launcher" / "adoptium_cache.json"
+ADOPTIUM_CACHE_TTL = 6 * 60 * 60
+_ADOPTIUM_PACKAGES: Optional[dict] = None
+# Temurin JREs shared by all instances, one per Java feature version
+JRES_DIR = MC_DIR / "jres"
+JAVA_BIN_REL = "bin/java.exe" if os.name == "nt" else "bin/java"
+_JRE_INSTALL_LOCK = threading.Lock()
 
 JAVA_CANDIDATES = [
     os.environ.get("JAVA_HOME"),
     shutil.which("java"),
 ]
 
+_SLUG_STRIP_RE = re.compile(r"[^a-zA-Z0-9\-_. ]+")
+_SLUG_SPACE_RE = re.compile(r"[\s_]+")
+_MC_VERSION_SPLIT_RE = re.compile(r"[.\-]")
+# e.g. .../org/ow2/asm/asm-tree/9.7.1/asm-tree-9.7.1.jar
+_ASM_CP_ENTRY_RE = re.compile(
+    r".*/org/ow2/asm/(?P<artifact>asm(?:-[a-z]+)*)/(?P<ver>\d+(?:\.\d+)+)/(?P=artifact)-(?P=ver)\.jar$"
+)
+# libraries/org/ow2/asm/<artifact>/<version>/ directory names
+_ASM_ARTIFACT_RE = re.compile(r"asm(?:-[a-z]+)*$")
+_ASM_VERSION_DIR_RE = re.compile(r"\d+(?:\.\d+)*$")
+
 # ---- Eclipse Adoptium JVM bundling helpers ----
+@lru_cache(maxsize=256)
 def _parse_mc_version(ver: str) -> tuple:
-    parts = re.split(r"[.\-]", ver or "")
+    parts = _MC_VERSION_SPLIT_RE.split(ver or "")
     nums = []
     for p in parts:
         try:
@@ -86,6 +265,7 @@ def _parse_mc_version(ver: str) -> tuple:
     return tuple(nums[:3])
 
 
+@lru_cache(maxsize=256)
 def _required_java_feature_version(mc_ver: str) -> int:
     """Return Java feature version required/recommended for a given MC version.
     1.20.5+ -> 21, 1.18.0..1.20.4 -> 17, 1.17.x -> 16, else -> 8
@@ -122,93 +302,301 @@ def _adoptium_arch() -> str:
     return "x64"
 
 
-def _ensure_adoptium_jre(java_feature: int, inst_dir: Path) -> Path:
-    """Ensure a Temurin JRE for the given Java feature exists under the instance dir.
-    Returns the path to the java executable.
+def _load_adoptium_cache() -> dict:
+    global _ADOPTIUM_PACKAGES
+    if _ADOPTIUM_PACKAGES is None:
+        try:
+            data = json.loads(ADOPTIUM_CACHE_FILE.read_text("utf-8"))
+        except Exception:
+            data = {}
+        _ADOPTIUM_PACKAGES = data if isinstance(data, dict) else {}
+    return _ADOPTIUM_PACKAGES
+
+
+def _adoptium_package(client: httpx.Client, java_feature: int, os_name: str, arch: str) -> tuple[str, Optional[str]]:
+    """Return (download link, file name) of the latest Temurin JRE package.
+
+    Answers are cached per (feature, os, arch) for ADOPTIUM_CACHE_TTL, in memory
+    and on disk, so repeated installs skip the Adoptium API round trip.
     """
-    jre_dir = inst_dir / f"jre-temurin-{java_feature}"
-    java_bin = jre_dir / ("bin/java.exe" if os.name == "nt" else "bin/java")
-    if java_bin.exists():
-        return java_bin
+    cache = _load_adoptium_cache()
+    key = f"{java_feature}/{os_name}/{arch}"
+    hit = cache.get(key)
+    if isinstance(hit, list) and len(hit) == 3 and hit[2] > time.time():
+        return hit[0], hit[1]
 
-    os_name = _adoptium_os()
-    arch = _adoptium_arch()
     api_url = (
         f"https://api.adoptium.net/v3/assets/latest/{java_feature}/hotspot?"
         f"architecture={arch}&os={os_name}&image_type=jre"
     )
-    with httpx.Client(timeout=300.0, follow_redirects=True) as client:
-        r = client.get(api_url)
-        r.raise_for_status()
-        assets = r.json()
-        if not assets:
-            raise RuntimeError(f"No Adoptium assets for Java {java_feature} on {os_name}/{arch}")
-        download_link = None
-        filename = None
-        for a in assets:
-            b = a.get("binary", {})
-            pkg = b.get("package", {})
-            link = pkg.get("link")
-            name = pkg.get("name")
-            if not link:
-                continue
-            if os_name == "windows" and str(name).endswith(".zip"):
-                download_link = link
-                filename = name
-                break
-            if os_name != "windows" and (str(name).endswith(".tar.gz") or str(name).endswith(".tgz")):
-                download_link = link
-                filename = name
-                break
-        if not download_link:
-            b = assets[0].get("binary", {})
-            pkg = b.get("package", {})
-            download_link = pkg.get("link")
-            filename = pkg.get("name")
-        if not download_link:
-            raise RuntimeError("Failed to locate Adoptium download link")
-
-        jre_dir.mkdir(parents=True, exist_ok=True)
-        with tempfile.TemporaryDirectory(prefix="adoptium_") as td:
-            tmp = Path(td)
-            file_path = tmp / (filename or f"temurin-{java_feature}.pkg")
-            with client.stream("GET", download_link) as resp:
-                resp.raise_for_status()
-                with file_path.open("wb") as f:
-                    for chunk in resp.iter_bytes():
-                        f.write(chunk)
-            # Extract archive
-            if file_path.suffix == ".zip":
-                with zipfile.ZipFile(file_path, "r") as zf:
-                    zf.extractall(tmp)
+    r = client.get(api_url)
+    r.raise_for_status()
+    assets = orjson.loads(r.content)
+    if not assets:
+        raise RuntimeError(f"No Adoptium assets for Java {java_feature} on {os_name}/{arch}")
+    download_link = None
+    filename = None
+    for a in assets:
+        b = a.get("binary", {})
+        pkg = b.get("package", {})
+        link = pkg.get("link")
+        name = pkg.get("name")
+        if not link:
+            continue
+        if os_name == "windows" and str(name).endswith(".zip"):
+            download_link = link
+            filename = name
+            break
+        if os_name != "windows" and (str(name).endswith(".tar.gz") or str(name).endswith(".tgz")):
+            download_link = link
+            filename = name
+            break
+    if not download_link:
+        b = assets[0].get("binary", {})
+        pkg = b.get("package", {})
+        download_link = pkg.get("link")
+        filename = pkg.get("name")
+    if not download_link:
+        raise RuntimeError("Failed to locate Adoptium download link")
+
+    cache[key] = [download_link, filename, time.time() + ADOPTIUM_CACHE_TTL]
+    try:
+        _write_json(ADOPTIUM_CACHE_FILE, cache)
+    except Exception:
+        pass
+    return download_link, filename
+
+
+# Archives up to this size are buffered in memory instead of a temp file. Most
+# .mrpack files are a few MB (mods are downloaded separately), so they never touch
+# disk; 32 MiB keeps the worst case bounded across concurrent install workers.
+ARCHIVE_SPOOL_MAX = 32 << 20
+# Read/write size for downloads and file copies (fewer, larger syscalls)
+COPY_CHUNK_SIZE = 1 << 20
+
+
+def _copy_file(src: str, dst: str) -> None:
+    """Copy file contents, in-kernel via sendfile where the OS supports it."""
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        if hasattr(os, "sendfile"):
+            try:
+                offset = 0
+                while True:
+                    sent = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, COPY_CHUNK_SIZE)
+                    if not sent:
+                        return
+                    offset += sent
+            except OSError:
+                # e.g. filesystems without sendfile support; start over in userspace
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+
+
+# Below these sizes a threaded extract costs more than it saves
+PARALLEL_EXTRACT_MIN_MEMBERS = 64
+PARALLEL_EXTRACT_MIN_BYTES = 16 << 20
+
+
+def _extract_zip(zf: zipfile.ZipFile, dest: str) -> None:
+    """Extract every member of `zf` into `dest`, spreading large archives over threads.
+
+    `zf` must wrap an open file object (as the spooled downloads do). ZipFile then
+    guards each seek+read of the shared handle with its own lock, while inflating
+    (zlib releases the GIL) and writing the members run in parallel.
+    """
+    members = zf.infolist()
+    if (
+        len(members) < PARALLEL_EXTRACT_MIN_MEMBERS
+        or sum(m.file_size for m in members) < PARALLEL_EXTRACT_MIN_BYTES
+    ):
+        zf.extractall(dest, members)
+        return
+
+    def _extract_bucket(bucket: list[zipfile.ZipInfo]) -> None:
+        for m in bucket:
+            try:
+                zf.extract(m, dest)
+            except FileExistsError:
+                # Lost a race creating a parent dir with another worker; it exists now
+                zf.extract(m, dest)
+
+    workers = min(8, os.cpu_count() or 1)
+    buckets = [members[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for _ in ex.map(_extract_bucket, buckets):
+            pass
+
+
+def _scan_tree(root: str, dirs: list[str], files: list[str]) -> None:
+    """Collect every directory and file path below `root` in a single scandir pass."""
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                dirs.append(entry.path)
+                _scan_tree(entry.path, dirs, files)
             else:
-                with tarfile.open(file_path, "r:gz") as tf:
-                    tf.extractall(tmp)
-            # Find extracted root containing bin/java
-            os_java = ("bin/java.exe" if os.name == "nt" else "bin/java")
-            extracted_root = None
-            for root, dirs, files in os.walk(tmp):
-                candidate = Path(root) / os_java
-                if candidate.exists():
-                    extracted_root = Path(root)
-                    break
-            if not extracted_root:
-                raise RuntimeError("Failed to locate extracted JRE bin/java")
-            # Move into place
-            for item in extracted_root.iterdir():
-                dest = jre_dir / item.name
-                if item.is_dir():
-                    shutil.copytree(item, dest, dirs_exist_ok=True)
-                else:
-                    shutil.copy2(item, dest)
+                files.append(entry.path)
 
-    if not java_bin.exists():
-        raise RuntimeError("JRE setup incomplete; java binary missing")
+
+def _find_dir_containing(root: str, rel_path: str) -> Optional[str]:
+    """Breadth-first scandir search for the shallowest directory containing `rel_path`."""
+    level = [root]
+    while level:
+        next_level: list[str] = []
+        for d in level:
+            if os.path.exists(os.path.join(d, rel_path)):
+                return d
+            with os.scandir(d) as it:
+                next_level.extend(e.path for e in it if e.is_dir(follow_symlinks=False))
+        level = next_level
+    return None
+
+
+def _copy_tree_parallel(src_root: str, dst_root: str) -> int:
+    """Copy the contents of `src_root` into `dst_root` using a thread pool; returns the file count.
+
+    Overrides are mostly thousands of tiny config files, so the copy is bound by
+    per-file syscalls and parallelizes well.
+    """
+    dirs: list[str] = []
+    files: list[str] = []
+    _scan_tree(src_root, dirs, files)
+    cut = len(src_root) + 1
+    os.makedirs(dst_root, exist_ok=True)
+    # Create the whole directory skeleton up front so copy workers never race on mkdir
+    for d in dirs:
+        os.makedirs(os.path.join(dst_root, d[cut:]), exist_ok=True)
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        for _ in ex.map(lambda src: _copy_file(src, os.path.join(dst_root, src[cut:])), files):
+            pass
+    return len(files)
+
+
+class _IterReader(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks (e.g. an HTTP body)."""
+
+    def __init__(self, chunks) -> None:
+        self._chunks = iter(chunks)
+        self._buf = b""
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while self._pos >= len(self._buf):
+            try:
+                self._buf = next(self._chunks)
+            except StopIteration:
+                return 0
+            self._pos = 0
+        n = min(len(b), len(self._buf) - self._pos)
+        b[:n] = self._buf[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+def _install_shared_jre(java_feature: int) -> Path:
+    """Ensure a Temurin JRE for the given Java feature exists under MC_DIR/jres.
+    Returns the JRE directory.
+    """
+    jre_dir = JRES_DIR / f"temurin-{java_feature}"
+    java_bin = jre_dir / JAVA_BIN_REL
+    if java_bin.exists():
+        return jre_dir
+
+    # Serialize installs so concurrent jobs never download into the same directory
+    with _JRE_INSTALL_LOCK:
+        if java_bin.exists():
+            return jre_dir
+        os_name = _adoptium_os()
+        arch = _adoptium_arch()
+        with httpx.Client(timeout=300.0, follow_redirects=True) as client:
+            download_link, filename = _adoptium_package(client, java_feature, os_name, arch)
+
+            # Extract next to the destination so moving it into place is a same-filesystem rename
+            JRES_DIR.mkdir(parents=True, exist_ok=True)
+            with tempfile.TemporaryDirectory(prefix=".adoptium_", dir=JRES_DIR) as td:
+                tmp = Path(td)
+                # Extract straight from the download stream; nothing is written but the JRE itself
+                with client.stream("GET", download_link) as resp:
+                    resp.raise_for_status()
+                    if (filename or "").endswith(".zip"):
+                        # Zip needs random access, so spool it (in memory while small)
+                        with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_MAX) as spool:
+                            for chunk in resp.iter_bytes(COPY_CHUNK_SIZE):
+                                spool.write(chunk)
+                            spool.seek(0)
+                            with zipfile.ZipFile(spool, "r") as zf:
+                                _extract_zip(zf, tmp)
+                    else:
+                        with tarfile.open(
+                            fileobj=_IterReader(resp.iter_bytes(COPY_CHUNK_SIZE)),
+                            mode="r|gz",
+                            bufsize=COPY_CHUNK_SIZE,
+                            copybufsize=COPY_CHUNK_SIZE,
+                        ) as tf:
+                            if hasattr(tarfile, "data_filter"):
+                                tf.extractall(tmp, filter="data")
+                            else:
+                                tf.extractall(tmp)
+                # Find extracted root containing bin/java
+                found = _find_dir_containing(td, JAVA_BIN_REL)
+                if not found:
+                    raise RuntimeError("Failed to locate extracted JRE bin/java")
+                # Move into place: a single rename, with a copy only across filesystems
+                if jre_dir.exists():
+                    shutil.rmtree(jre_dir)  # leftovers of an interrupted install
+                try:
+                    os.replace(found, jre_dir)
+                except OSError:
+                    shutil.copytree(found, jre_dir, copy_function=shutil.copy)
+
+        if not java_bin.exists():
+            raise RuntimeError("JRE setup incomplete; java binary missing")
+        try:
+            if os.name != "nt":
+                java_bin.chmod(java_bin.stat().st_mode | 0o111)
+        except Exception:
+            pass
+    return jre_dir
+
+
+def _link_jre(shared_dir: Path, link_path: Path) -> None:
+    """Expose a shared JRE inside an instance: symlink, else hardlinked copy, else plain copy."""
+    if link_path.is_symlink() or link_path.is_file():
+        link_path.unlink()
+    elif link_path.exists():
+        # Partial per-instance JRE left by an interrupted install
+        shutil.rmtree(link_path, ignore_errors=True)
     try:
-        if os.name != "nt":
-            java_bin.chmod(java_bin.stat().st_mode | 0o111)
-    except Exception:
+        os.symlink(shared_dir, link_path, target_is_directory=True)
+        return
+    except OSError:
         pass
+    try:
+        shutil.copytree(shared_dir, link_path, copy_function=os.link)
+    except OSError:
+        shutil.rmtree(link_path, ignore_errors=True)
+        shutil.copytree(shared_dir, link_path)
+
+
+def _ensure_adoptium_jre(java_feature: int, inst_dir: Path) -> Path:
+    """Ensure a Temurin JRE for the given Java feature is available to the instance.
+
+    The JRE is downloaded once into MC_DIR/jres and linked into the instance dir
+    as jre-temurin-<feature>. Returns the path to the java executable.
+    """
+    inst_jre = inst_dir / f"jre-temurin-{java_feature}"
+    java_bin = inst_jre / JAVA_BIN_REL
+    if java_bin.exists():
+        return java_bin
+    _link_jre(_install_shared_jre(java_feature), inst_jre)
+    if not java_bin.exists():
+        raise RuntimeError("JRE setup incomplete; java binary missing")
     return java_bin
 
 
@@ -219,35 +607,56 @@ class InstallModpackRequest(BaseModel):
 
 
 def _slugify(name: str) -> str:
-    s = re.sub(r"[^a-zA-Z0-9\-_. ]+", "", name).strip().lower()
-    s = re.sub(r"[\s_]+", "-", s)
+    s = _SLUG_STRIP_RE.sub("", name).strip().lower()
+    s = _SLUG_SPACE_RE.sub("-", s)
     return s or f"instance-{secrets.token_hex(4)}"
 
 
 def _write_json(path: Path, data: dict) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+    path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
 
 
 @router.get("/", response_class=HTMLResponse)
 async def browse_page(request: Request):
-    return templates.TemplateResponse("browse.html", {"request": request})
+    return render("browse.html", {})
 
 
 @router.get("/modpacks", response_class=HTMLResponse)
 async def modpacks_page(request: Request):
-    return templates.TemplateResponse("modpacks.html", {"request": request})
+    return render("modpacks.html", {})
 
 
 @router.get("/installed", response_class=HTMLResponse)
 async def installed_page(request: Request):
-    return templates.TemplateResponse("installed.html", {"request": request})
+    return render("installed.html", {})
 
 
 @router.get("/settings", response_class=HTMLResponse)
 async def settings_page(request: Request):
-    return templates.TemplateResponse("settings.html", {"request": request})
+    return render("settings.html", {})
+
+
+# Interned facet strings for the fixed filter choices offered by the UI
+_PROJECT_TYPE_FACETS = {
+    t: sys.intern(f"project_type:{t}") for t in ("mod", "modpack", "resourcepack", "shader", "datapack")
+}
+_LOADER_FACETS = {
+    name: sys.intern(f"categories:{name}") for name in ("fabric", "forge", "quilt", "neoforge")
+}
+
+
+@lru_cache(maxsize=512)
+def _build_facets(type_: str, loader: str, mc: str) -> tuple[tuple[str, ...], ...]:
+    """Build (and memoize) Modrinth search facets from the browse filters."""
+    facets: list[tuple[str, ...]] = []
+    if type_:
+        facets.append((_PROJECT_TYPE_FACETS.get(type_) or f"project_type:{type_}",))
+    if loader:
+        facets.append((_LOADER_FACETS.get(loader) or f"categories:{loader}",))
+    if mc:
+        facets.append((f"versions:{mc}",))
+    return tuple(facets)
 
 
 @router.get("/browse/search", response_class=HTMLResponse)
@@ -258,192 +667,258 @@ async def browse_search(
     loader: str = Query(""),
     mc: str = Query(""),
     index: Optional[str] = Query(None),
+    client: ModrinthClient = Depends(get_modrinth),
 ):
-    settings = get_settings()
-    # Build Modrinth facets from filters
-    facets: list[list[str]] = []
-    if type:
-        facets.append([f"project_type:{type}"])
-    if loader:
-        facets.append([f"categories:{loader}"])
-    if mc:
-        facets.append([f"versions:{mc}"])
-    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
-        projects = await client.search_projects(q, facets=facets or None, index=index)
-    return templates.TemplateResponse(
+    facets = _build_facets(type, loader, mc)
+    projects = await client.search_projects(q, facets=facets, index=index)
+    return render(
         "components/project_list.html",
-        {"request": request, "projects": projects, "query": q},
+        {"projects": projects, "query": q},
+        headers=_cache_headers(SEARCH_CACHE_TTL),
     )
 
 
 @router.get("/browse/featured_modpacks", response_class=HTMLResponse)
-async def featured_modpacks(request: Request, limit: int = Query(9, ge=1, le=50)):
-    settings = get_settings()
-    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
-        projects = await client.discover_modpacks(limit=limit)
-    return templates.TemplateResponse(
+async def featured_modpacks(
+    request: Request,
+    limit: int = Query(9, ge=1, le=50),
+    client: ModrinthClient = Depends(get_modrinth),
+):
+    # Cached in the client's search cache under its own key (limit/index differ
+    # from /browse/search) with the longer discover TTL, so repeat loads skip Modrinth
+    projects = await client.discover_modpacks(limit=limit)
+    return render(
         "components/project_list.html",
-        {"request": request, "projects": projects, "query": ""},
+        {"projects": projects, "query": ""},
+        headers=_cache_headers(SEARCH_CACHE_TTL),
     )
 
 
+def _json_response_with_etag(request: Request, data) -> Response:
+    """Serialize `data` once, tag it with a content hash and honour If-None-Match."""
+    body = orjson.dumps(data)
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/api/projects/{project_id}")
-async def get_project(project_id: str):
-    settings = get_settings()
-    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
-        data = await client.get_project(project_id)
-    return JSONResponse(data)
+async def get_project(request: Request, project_id: str, client: ModrinthClient = Depends(get_modrinth)):
+    data = await client.get_project(project_id)
+    return _json_response_with_etag(request, data)
 
 
 @router.get("/api/projects/{project_id}/versions")
-async def get_project_versions(project_id: str):
-    settings = get_settings()
-    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
-        data = await client.get_project_versions(project_id)
-    return JSONResponse(data)
+async def get_project_versions(request: Request, project_id: str, client: ModrinthClient = Depends(get_modrinth)):
+    data = await client.get_project_versions(project_id)
+    return _json_response_with_etag(request, data)
 
 
-@router.get("/modpacks/{id_or_slug}", response_class=HTMLResponse)
-async def modpack_detail_page(request: Request, id_or_slug: str):
-    settings = get_settings()
-    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
-        project = await client.get_project(id_or_slug)
-        versions = await client.get_project_versions(id_or_slug)
-    return templates.TemplateResponse(
-        "modpack_detail.html",
-        {"request": request, "project": project, "versions": versions},
+def _parse_modrinth_timestamp(value) -> Optional[datetime]:
+    """Parse a Modrinth ISO-8601 timestamp, truncated to whole seconds for HTTP dates."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.replace(microsecond=0)
+
+
+async def _project_detail_response(request: Request, client: ModrinthClient, id_or_slug: str) -> Response:
+    project, versions = await asyncio.gather(
+        client.get_project(id_or_slug),
+        client.get_project_versions(id_or_slug),
     )
+    # Modrinth bumps `updated` whenever the project or its versions change
+    last_modified = _parse_modrinth_timestamp(project.get("updated"))
+    headers = _cache_headers(PROJECT_CACHE_TTL)
+    if last_modified:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    if last_modified and not_modified_since(request, last_modified):
+        return Response(status_code=304, headers=headers)
+    return render("modpack_detail.html", {"project": project, "versions": versions}, headers=headers)
+
+
+@router.get("/modpacks/{id_or_slug}", response_class=HTMLResponse)
+async def modpack_detail_page(request: Request, id_or_slug: str, client: ModrinthClient = Depends(get_modrinth)):
+    return await _project_detail_response(request, client, id_or_slug)
 
 
 @router.get("/projects/{id_or_slug}", response_class=HTMLResponse)
-async def project_detail_page(request: Request, id_or_slug: str):
+async def project_detail_page(request: Request, id_or_slug: str, client: ModrinthClient = Depends(get_modrinth)):
     """Generic project detail page for non-modpack listings (mods, resource packs, shaders, etc.)."""
-    settings = get_settings()
-    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
-        project = await client.get_project(id_or_slug)
-        versions = await client.get_project_versions(id_or_slug)
     # Reuse the existing detail template, which is generic enough for all project types
-    return templates.TemplateResponse(
-        "modpack_detail.html",
-        {"request": request, "project": project, "versions": versions},
-    )
+    return await _project_detail_response(request, client, id_or_slug)
 
 
-def _install_modpack_job(job_id: str, version_id: str, instance_name: str, user_agent: str):
-    JOBS[job_id] = {"status": "running", "progress": 0, "message": "Starting…"}
+# Concurrent downloads per modpack install; all share one HTTP connection pool
+MODPACK_DOWNLOAD_CONCURRENCY = 32
+# Pending index entries handed to the download workers at any one time
+MODPACK_DOWNLOAD_QUEUE_SIZE = 64
+
+
+# Attempts per index file; a transfer error or hash mismatch moves on to the next attempt
+MODPACK_DOWNLOAD_ATTEMPTS = 2
+
+
+async def _download_index_file(client: httpx.AsyncClient, inst_dir: Path, entry: dict) -> bool:
+    rel_path = entry.get("path")
+    urls = entry.get("downloads") or []
+    if not rel_path or not urls:
+        return False
+    target_path = inst_dir / rel_path
+    target_path.parent.mkdir(parents=True, exist_ok=True)
+    expected = ((entry.get("hashes") or {}).get("sha512") or "").lower()
+    for attempt in range(MODPACK_DOWNLOAD_ATTEMPTS):
+        # Retries rotate through the mirrors the index lists
+        url = urls[attempt % len(urls)]
+        try:
+            # Hash while streaming so verification needs no second read of the file
+            digest = hashlib.sha512()
+            async with client.stream("GET", url) as r:
+                r.raise_for_status()
+                with target_path.open("wb") as f_out:
+                    async for chunk in r.aiter_bytes(COPY_CHUNK_SIZE):
+                        digest.update(chunk)
+                        f_out.write(chunk)
+            if not expected or digest.hexdigest() == expected:
+                return True
+            logger.warning("[Install] SHA-512 mismatch for %s", url)
+        except Exception as e:
+            logger.warning("[Install] Failed to download %s: %s", url, e)
+    # Best-effort: skip failed file and continue, but never leave a corrupt one behind
     try:
-        with httpx.Client(headers={"User-Agent": user_agent, "Accept": "application/json"}, timeout=30.0) as client:
-            # 1) Get version info
-            JOBS[job_id].update(message="Fetching version metadata…", progress=2)
-            r_v = client.get(f"https://api.modrinth.com/v2/version/{version_id}")
-            r_v.raise_for_status()
-            version = r_v.json()
-
-            # 2) Find primary .mrpack file
-            files = version.get("files", [])
-            mrpack = None
-            for f in files:
-                fn = f.get("filename", "")
-                if fn.endswith(".mrpack"):
-                    mrpack = f
-                    break
-            if not mrpack and files:
-                # Fallback: first file
-                mrpack = files[0]
-            if not mrpack:
-                raise RuntimeError("No files found for version; cannot install.")
-
-            dl_url = (mrpack.get("url") or (mrpack.get("downloads") or [None])[0])
-            if not dl_url:
-                raise RuntimeError("No download URL available for version file.")
-
-            # 3) Prepare instance directory
-            inst_slug = _slugify(instance_name)
-            inst_dir = INSTANCES_DIR / inst_slug
-            inst_dir.mkdir(parents=True, exist_ok=True)
-
-            with tempfile.TemporaryDirectory(prefix="cottage_mrpack_") as td:
-                tdir = Path(td)
-                pack_path = tdir / (mrpack.get("filename") or f"{version_id}.mrpack")
-                JOBS[job_id].update(message="Downloading .mrpack…", progress=8)
-                with client.stream("GET", dl_url) as r:
+        target_path.unlink()
+    except OSError:
+        pass
+    return False
+
+
+async def _install_modpack(job_id: str, version_id: str, instance_name: str, user_agent: str) -> None:
+    limits = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+    headers = {"User-Agent": user_agent, "Accept": "application/json"}
+    async with httpx.AsyncClient(headers=headers, timeout=30.0, limits=limits, http2=HTTP2_AVAILABLE) as client:
+        # 1) Get version info
+        JOBS[job_id].update(message="Fetching version metadata…", progress=2)
+        r_v = await client.get(f"https://api.modrinth.com/v2/version/{version_id}")
+        r_v.raise_for_status()
+        version = orjson.loads(r_v.content)
+
+        # 2) Find primary .mrpack file
+        files = version.get("files", [])
+        mrpack = None
+        for f in files:
+            fn = f.get("filename", "")
+            if fn.endswith(".mrpack"):
+                mrpack = f
+                break
+        if not mrpack and files:
+            # Fallback: first file
+            mrpack = files[0]
+        if not mrpack:
+            raise RuntimeError("No files found for version; cannot install.")
+
+        dl_url = (mrpack.get("url") or (mrpack.get("downloads") or [None])[0])
+        if not dl_url:
+            raise RuntimeError("No download URL available for version file.")
+
+        # 3) Prepare instance directory
+        inst_slug = _slugify(instance_name)
+        inst_dir = INSTANCES_DIR / inst_slug
+        inst_dir.mkdir(parents=True, exist_ok=True)
+
+        with tempfile.TemporaryDirectory(prefix="cottage_mrpack_") as td:
+            tdir = Path(td)
+            JOBS[job_id].update(message="Downloading .mrpack…", progress=8)
+            # Spool the archive (zip needs seeking) and extract it without a second file
+            with tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_MAX) as spool:
+                async with client.stream("GET", dl_url) as r:
                     r.raise_for_status()
-                    with pack_path.open("wb") as f_out:
-                        for chunk in r.iter_bytes():
-                            f_out.write(chunk)
+                    async for chunk in r.aiter_bytes(COPY_CHUNK_SIZE):
+                        spool.write(chunk)
+                spool.seek(0)
                 JOBS[job_id].update(message="Extracting .mrpack…", progress=15)
-                with zipfile.ZipFile(pack_path, "r") as zf:
-                    zf.extractall(tdir)
-
-                index_path = tdir / "modrinth.index.json"
-                if not index_path.exists():
-                    raise RuntimeError("modrinth.index.json not found in pack.")
-                index = json.loads(index_path.read_text("utf-8"))
-                # Persist index to instance for launch/runtime info
-                _write_json(inst_dir / "modrinth.index.json", index)
-                files_entries = index.get("files", [])
-                total = max(1, len(files_entries))
-                done = 0
-
-                # 4) Download files referenced by index concurrently (up to 10 at a time)
-                def _download_entry(entry: dict) -> bool:
-                    rel_path = entry.get("path")
-                    urls = entry.get("downloads") or []
-                    if not rel_path or not urls:
-                        return False
-                    target_path = inst_dir / rel_path
-                    target_path.parent.mkdir(parents=True, exist_ok=True)
-                    url0 = urls[0]
+                with zipfile.ZipFile(spool, "r") as zf:
+                    _extract_zip(zf, tdir)
+
+            index_path = tdir / "modrinth.index.json"
+            if not index_path.exists():
+                raise RuntimeError("modrinth.index.json not found in pack.")
+            index = orjson.loads(index_path.read_bytes())
+            # Persist index to instance for launch/runtime info
+            _write_json(inst_dir / "modrinth.index.json", index)
+            files_entries = index.get("files", [])
+            total = max(1, len(files_entries))
+            done = 0
+            last_pct = -1
+
+            # 4) Download files referenced by index with a fixed set of workers fed
+            # from a bounded queue. Progress needs no lock: every coroutine runs on
+            # this job's event loop thread.
+            queue: asyncio.Queue = asyncio.Queue(maxsize=MODPACK_DOWNLOAD_QUEUE_SIZE)
+
+            async def _worker() -> None:
+                nonlocal done, last_pct
+                while True:
+                    entry = await queue.get()
                     try:
-                        with client.stream("GET", url0) as r:
-                            r.raise_for_status()
-                            with target_path.open("wb") as f_out:
-                                for chunk in r.iter_bytes():
-                                    f_out.write(chunk)
-                        return True
+                        await _download_index_file(client, inst_dir, entry)
                     except Exception as e:
-                        # Best-effort: skip failed file and continue
-                        print("[Install] Failed to download", url0, e)
-                        return False
-
-                JOBS[job_id].update(message="Downloading files…", progress=15)
-                lock = threading.Lock()
-                with ThreadPoolExecutor(max_workers=10) as ex:
-                    futures = [ex.submit(_download_entry, entry) for entry in files_entries]
-                    for _ in as_completed(futures):
-                        with lock:
-                            done += 1
-                            pct = 15 + int(80 * (done / total))
-                            JOBS[job_id].update(message=f"Downloading files… {done}/{total}", progress=pct)
-
-                # 5) Apply overrides directory if present
-                overrides = tdir / "overrides"
-                if overrides.exists():
-                    JOBS[job_id].update(message="Applying overrides…", progress=96)
-                    for root, dirs, files in os.walk(overrides):
-                        rel = Path(root).relative_to(overrides)
-                        dest_root = inst_dir / rel
-                        dest_root.mkdir(parents=True, exist_ok=True)
-                        for fn in files:
-                            src_f = Path(root) / fn
-                            dst_f = dest_root / fn
-                            shutil.copy2(src_f, dst_f)
-
-            # 6) Write instance manifest
-            manifest = {
-                "instance_name": instance_name,
-                "slug": inst_slug,
-                "version_id": version_id,
-                "created_at": __import__("datetime").datetime.utcnow().isoformat() + "Z",
-                # for updates
-                "project_id": version.get("project_id"),
-                "version_number": version.get("version_number"),
-            }
-            _write_json(inst_dir / "instance.json", manifest)
+                        logger.warning("[Install] Skipping index entry %s: %s", entry.get("path"), e)
+                    done += 1
+                    pct = 15 + int(80 * (done / total))
+                    # Large packs finish many files per percent; only publish visible changes
+                    if pct != last_pct or done == total:
+                        last_pct = pct
+                        JOBS[job_id].update(message=f"Downloading files… {done}/{total}", progress=pct)
+                    queue.task_done()
+
+            JOBS[job_id].update(message="Downloading files…", progress=15)
+            workers = [
+                asyncio.create_task(_worker())
+                for _ in range(min(MODPACK_DOWNLOAD_CONCURRENCY, len(files_entries)))
+            ]
+            try:
+                for entry in files_entries:
+                    await queue.put(entry)
+                await queue.join()
+            finally:
+                for w in workers:
+                    w.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+
+            # 5) Apply overrides directory if present
+            overrides = tdir / "overrides"
+            if overrides.exists():
+                JOBS[job_id].update(message="Applying overrides…", progress=96)
+                _copy_tree_parallel(str(overrides), str(inst_dir))
+
+    # 6) Write instance manifest
+    manifest = {
+        "instance_name": instance_name,
+        "slug": inst_slug,
+        "version_id": version_id,
+        "created_at": __import__("datetime").datetime.utcnow().isoformat() + "Z",
+        # for updates
+        "project_id": version.get("project_id"),
+        "version_number": version.get("version_number"),
+    }
+    _write_json(inst_dir / "instance.json", manifest)
+
 
-        JOBS[job_id].update(status="completed", progress=100, message="Install complete")
+def _install_modpack_job(job_id: str, version_id: str, instance_name: str, user_agent: str):
+    JOBS.setdefault(job_id, {}).update(status="running", progress=0, message="Starting…")
+    try:
+        # Runs in a worker thread, so it gets its own event loop for the async downloads
+        asyncio.run(_install_modpack(job_id, version_id, instance_name, user_agent))
+        JOBS[job_id].update(status="completed", progress=100, message="Install complete", finished_at=time.monotonic())
     except Exception as e:
-        JOBS[job_id].update(status="failed", message=str(e))
+        JOBS[job_id].update(status="failed", message=str(e), finished_at=time.monotonic())
 
 
 @router.post("/api/install/modpack", response_class=HTMLResponse)
@@ -451,33 +926,37 @@ async def install_modpack(
     version_id: str = Form(...),
     instance_name: Optional[str] = Form(None),
     project_title: Optional[str] = Form(None),
-    background_tasks: BackgroundTasks = None,
 ):
-    settings = get_settings()
     name = instance_name or (project_title or "Modpack")
-    job_id = secrets.token_hex(8)
-    JOBS[job_id] = {"status": "queued", "progress": 0, "message": "Queued"}
-    background_tasks.add_task(_install_modpack_job, job_id, version_id, name, settings.modrinth_user_agent)
+    job_id = _new_job()
+    _submit_job(INSTALL_POOL, job_id, _install_modpack_job, version_id, name, USER_AGENT)
     # Return an HTMX-friendly snippet that kicks off polling
     html = f'''<div class="p-3 rounded border border-slate-800 bg-slate-900/50">
-      <div class="text-sm text-slate-300">Started install: <span class="font-mono">{name}</span></div>
+      <div class="text-sm text-slate-300">Started install: <span class="font-mono">{escape(name)}</span></div>
       <div id="job-{job_id}" hx-get="/api/jobs/{job_id}" hx-trigger="load, every 1s" hx-swap="innerHTML"></div>
     </div>'''
     return HTMLResponse(content=html)
 
 
 @router.get("/api/jobs/{job_id}", response_class=HTMLResponse)
-async def get_job_status(job_id: str):
+async def get_job_status(request: Request, job_id: str):
     job = JOBS.get(job_id)
     if not job:
-        return HTMLResponse('<div class="text-red-400 text-sm">Job not found.</div>')
+        return HTMLResponse(_HTML_JOB_NOT_FOUND)
     status = job.get("status", "running")
     progress = job.get("progress", 0)
-    msg = job.get("message", "")
+    # Messages carry exception text and file names from third-party pack indexes
+    msg = escape(job.get("message", ""))
+    # Polled every second; let the browser revalidate and skip re-rendering unchanged state
+    state = f"{job_id}\0{status}\0{progress}\0{msg}".encode("utf-8")
+    etag = '"' + hashlib.blake2b(state, digest_size=12).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
     if status == "completed":
-        return HTMLResponse(f'<div class="text-emerald-400 text-sm">✅ {msg} ({progress}%)</div>')
+        return HTMLResponse(f'<div class="text-emerald-400 text-sm">✅ {msg} ({progress}%)</div>', headers=headers)
     if status == "failed":
-        return HTMLResponse(f'<div class="text-red-400 text-sm">❌ {msg}</div>')
+        return HTMLResponse(f'<div class="text-red-400 text-sm">❌ {msg}</div>', headers=headers)
     # running/queued
     bar = f'''<div class="mt-2">
       <div class="w-full h-2 bg-slate-800 rounded">
@@ -485,7 +964,7 @@ async def get_job_status(job_id: str):
       </div>
       <div class="mt-1 text-xs text-slate-400">{msg} ({progress}%)</div>
     </div>'''
-    return HTMLResponse(bar)
+    return HTMLResponse(bar, headers=headers)
 
 
 def _dedupe_asm_in_cmd(cmd: list[str]) -> list[str]:
@@ -495,52 +974,46 @@ def _dedupe_asm_in_cmd(cmd: list[str]) -> list[str]:
     def _dedupe_cp_string(cp_str: str) -> str:
         sep = os.pathsep
         entries = cp_str.split(sep)
-        pat = re.compile(r".*/org/ow2/asm/(?P<artifact>asm(?:-[a-z]+)*)/(?P<ver>\\d+\\.\\d+)/(?P=artifact)-(?P<ver)\\.jar$")
-        versions: dict[str, list[tuple[tuple[int, int], str]]] = {}
-        for e in entries:
-            m = pat.match(e)
-            if not m:
+        # One regex pass: artifact -> [(version, position in classpath)]
+        groups: dict[str, list[tuple[tuple[int, ...], int]]] = {}
+        for i, e in enumerate(entries):
+            if "/org/ow2/asm/" not in e:
                 continue
-            art = m.group("artifact")
-            ver = m.group("ver")
-            try:
-                major, minor = ver.split(".", 1)
-                key = (int(major), int(minor))
-            except Exception:
-                key = (0, 0)
-            versions.setdefault(art, []).append((key, e))
-        keep_entries = set()
-        for art, lst in versions.items():
-            lst.sort()
-            _, best_entry = lst[-1]
-            keep_entries.add(best_entry)
-        new_entries: list[str] = []
-        for e in entries:
-            m = pat.match(e)
+            m = _ASM_CP_ENTRY_RE.match(e)
             if not m:
-                new_entries.append(e)
                 continue
-            if e in keep_entries:
-                new_entries.append(e)
-        return sep.join(new_entries)
+            ver = tuple(int(p) for p in m.group("ver").split("."))
+            groups.setdefault(m.group("artifact"), []).append((ver, i))
+        # Keep the highest version per artifact; drop the others by position
+        drop = {i for lst in groups.values() for _, i in sorted(lst)[:-1]}
+        if not drop:
+            return cp_str
+        return sep.join(e for i, e in enumerate(entries) if i not in drop)
 
     try:
-        # First, handle @argument files
-        for i, token in enumerate(cmd):
+        # First, handle the @argument file (launchers emit at most one)
+        for token in cmd:
             if token.startswith("@"):
-                arg_path = token[1:]
-                p = Path(arg_path)
-                if p.exists():
-                    try:
-                        lines = p.read_text(encoding="utf-8").splitlines()
-                        # find -cp / -classpath entry, expecting next line is the classpath string
-                        for j, line in enumerate(lines):
-                            if line.strip() in ("-cp", "-classpath") and j + 1 < len(lines):
-                                lines[j + 1] = _dedupe_cp_string(lines[j + 1])
-                                p.write_text("\n".join(lines), encoding="utf-8")
-                                break
-                    except Exception:
-                        pass
+                try:
+                    p = Path(token[1:])
+                    data = p.read_bytes()
+                    # The classpath is the line right after a -cp / -classpath line;
+                    # tolerate CRLF and padded flag lines, and keep the original endings
+                    lines = data.splitlines(keepends=True)
+                    start = 0
+                    for j, line in enumerate(lines[:-1]):
+                        start += len(line)
+                        if line.strip() in (b"-cp", b"-classpath"):
+                            cp_raw = lines[j + 1].rstrip(b"\r\n")
+                            cp_line = cp_raw.decode("utf-8")
+                            new_cp = _dedupe_cp_string(cp_line)
+                            if new_cp != cp_line:
+                                end = start + len(cp_raw)
+                                p.write_bytes(data[:start] + new_cp.encode("utf-8") + data[end:])
+                            break
+                except Exception:
+                    pass
+                break
 
         # Then, handle inline -cp if present
         cp_idx = None
@@ -561,46 +1034,33 @@ def _prune_asm_libraries(inst_dir: Path) -> list[str]:
     """
     removed: list[str] = []
     libs_root = inst_dir / "libraries" / "org" / "ow2" / "asm"
-    artifacts = [
-        "asm",
-        "asm-commons",
-        "asm-tree",
-        "asm-util",
-        "asm-analysis",
-    ]
     try:
-        for art in artifacts:
-            art_dir = libs_root / art
-            if not art_dir.is_dir():
-                continue
-            versions: list[tuple[tuple[int, ...], Path]] = []
-            for v in art_dir.iterdir():
-                if not v.is_dir():
-                    continue
-                ver = v.name
-                try:
-                    nums = tuple(int(p) for p in ver.split(".") if p.isdigit())
-                except Exception:
-                    nums = (0,)
-                versions.append((nums, v))
-            if len(versions) <= 1:
-                continue
-            versions.sort()
-            keep = versions[-1][1]
+        # libraries/org/ow2/asm/<artifact>/<version>/ -- two shallow scandirs, no Path per entry
+        with os.scandir(libs_root) as it:
+            art_dirs = [e.path for e in it if _ASM_ARTIFACT_RE.match(e.name) and e.is_dir()]
+        for art_dir in art_dirs:
+            with os.scandir(art_dir) as it:
+                versions = sorted(
+                    (tuple(int(p) for p in e.name.split(".")), e.path)
+                    for e in it
+                    if _ASM_VERSION_DIR_RE.match(e.name) and e.is_dir()
+                )
             for _, d in versions[:-1]:
-                try:
-                    shutil.rmtree(d, ignore_errors=True)
-                    removed.append(str(d))
-                except Exception:
-                    pass
+                shutil.rmtree(d, ignore_errors=True)
+                removed.append(d)
     except Exception:
-        # Non-fatal
+        # Non-fatal (including a missing libraries/org/ow2/asm)
         return removed
     return removed
 
 
+# Version directory prefixes written by the loader installers
+_LOADER_VERSION_PREFIXES = ("fabric-loader", "quilt-loader", "forge-", "neoforge-")
+
+
 def _launch_instance_job(job_id: str, slug: str):
-    JOBS[job_id] = {"status": "running", "progress": 0, "message": "Preparing launch…"}
+    JOBS.setdefault(job_id, {}).update(status="running", progress=0, message="Preparing launch…")
+    java_future = None
     try:
         inst_dir = INSTANCES_DIR / slug
         if not inst_dir.exists():
@@ -610,7 +1070,7 @@ def _launch_instance_job(job_id: str, slug: str):
         index_path = inst_dir / "modrinth.index.json"
         if not index_path.exists():
             raise RuntimeError("modrinth.index.json missing in instance. Reinstall the modpack.")
-        index = json.loads(index_path.read_text("utf-8"))
+        index = orjson.loads(index_path.read_bytes())
         deps = index.get("dependencies", {}) or {}
         mc_ver = deps.get("minecraft")
         fabric_loader = deps.get("fabric-loader")
@@ -618,32 +1078,30 @@ def _launch_instance_job(job_id: str, slug: str):
         forge_ver = deps.get("forge")
         neoforge_ver = deps.get("neoforge")
 
-        # Prepare per-instance bundled JVM from Eclipse Adoptium
         if not mc_ver:
             raise RuntimeError("Minecraft version missing from modrinth.index.json")
-        JOBS[job_id].update(message="Preparing bundled Java…", progress=5)
-        java_feature = _required_java_feature_version(mc_ver)
-        java = _ensure_adoptium_jre(java_feature, inst_dir)
+        _load_mll()
 
         # Require authenticated Microsoft account with Minecraft entitlement
         settings = get_settings()
-        auth = _load_auth_payload()
-        if not auth:
-            raise RuntimeError("Microsoft account required. Please sign in on the Settings page.")
-        # Refresh token and verify entitlement
-        if ms_account and settings.ms_client_id and auth.get("refresh_token"):
-            try:
-                refreshed = ms_account.complete_refresh(settings.ms_client_id, None, None, auth["refresh_token"])  # type: ignore[index]
-                if isinstance(refreshed, dict):
-                    auth.update({
-                        "refresh_token": refreshed.get("refresh_token", auth.get("refresh_token")),
-                        "access_token": refreshed.get("access_token", auth.get("access_token")),
-                        "name": refreshed.get("name", auth.get("name")),
-                        "id": refreshed.get("id", auth.get("id")),
-                    })
-                    _save_auth_payload(auth)
-            except Exception as e:
-                raise RuntimeError(f"Authentication refresh failed: {e}")
+        with _AUTH_REFRESH_LOCK:
+            auth = _load_auth_payload()
+            if not auth:
+                raise RuntimeError("Microsoft account required. Please sign in on the Settings page.")
+            # Refresh token and verify entitlement
+            if ms_account and settings.ms_client_id and auth.get("refresh_token"):
+                try:
+                    refreshed = ms_account.complete_refresh(settings.ms_client_id, None, None, auth["refresh_token"])  # type: ignore[index]
+                    if isinstance(refreshed, dict):
+                        auth.update({
+                            "refresh_token": refreshed.get("refresh_token", auth.get("refresh_token")),
+                            "access_token": refreshed.get("access_token", auth.get("access_token")),
+                            "name": refreshed.get("name", auth.get("name")),
+                            "id": refreshed.get("id", auth.get("id")),
+                        })
+                        _save_auth_payload(auth)
+                except Exception as e:
+                    raise RuntimeError(f"Authentication refresh failed: {e}")
         username = (auth.get("name") or os.getenv("USER") or os.getenv("USERNAME") or "Player")  # type: ignore[union-attr]
         uuid = auth.get("id")  # type: ignore[assignment]
         access_token = auth.get("access_token")
@@ -653,6 +1111,12 @@ def _launch_instance_job(job_id: str, slug: str):
         if mll_install is None or mll_command is None:
             raise RuntimeError("minecraft-launcher-lib not available. Ensure it's installed (see requirements.txt).")
 
+        # Signed in and able to launch: fetch/link the Eclipse Adoptium JRE (possibly a
+        # large download) alongside the game installs below
+        JOBS[job_id].update(message="Preparing bundled Java…", progress=5)
+        java_feature = _required_java_feature_version(mc_ver)
+        java_future = PREFLIGHT_POOL.submit(_ensure_adoptium_jre, java_feature, inst_dir)
+
         # Determine version id based on loader
         version_id = None
         if fabric_loader and mc_ver:
@@ -733,21 +1197,25 @@ def _launch_instance_job(job_id: str, slug: str):
             except TypeError:
                 mll_install.install_minecraft_version(version_id, str(MC_DIR))
 
+        # Libraries are final once the installs above are done; prune them while
+        # the fallback discovery below scans versions/
+        prune_future = PREFLIGHT_POOL.submit(_prune_asm_libraries, MC_DIR)
+
         # 4) Final fallback: discover any installed loader version matching the MC version
         if not _version_exists(version_id):
             versions_dir = MC_DIR / "versions"
             discovered = None
             if versions_dir.exists():
-                candidates = []
-                for d in versions_dir.iterdir():
-                    if not d.is_dir():
-                        continue
-                    name = d.name
-                    if name.endswith(f"-{mc_ver}") and (name.startswith("fabric-loader") or name.startswith("quilt-loader") or name.startswith("forge-") or name.startswith("neoforge-")):
-                        candidates.append(name)
-                candidates.sort(key=lambda n: (versions_dir / n).stat().st_mtime, reverse=True)
+                suffix = f"-{mc_ver}"
+                candidates: list[tuple[float, str]] = []
+                with os.scandir(versions_dir) as it:
+                    for entry in it:
+                        name = entry.name
+                        if name.endswith(suffix) and name.startswith(_LOADER_VERSION_PREFIXES) and entry.is_dir():
+                            candidates.append((entry.stat().st_mtime, name))
                 if candidates:
-                    discovered = candidates[0]
+                    # Most recently installed wins
+                    discovered = max(candidates)[1]
             if discovered:
                 version_id = discovered
 
@@ -756,12 +1224,14 @@ def _launch_instance_job(job_id: str, slug: str):
 
         # Prune duplicate ASM libraries from disk to avoid classpath duplicates
         try:
-            removed = _prune_asm_libraries(MC_DIR)
+            removed = prune_future.result()
             if removed:
                 JOBS[job_id].update(message="Pruned duplicate ASM libs…", progress=96)
         except Exception:
             pass
 
+        java = java_future.result()
+
         JOBS[job_id].update(message="Building launch command…", progress=96)
         opts = {
             "username": str(username),
@@ -780,14 +1250,18 @@ def _launch_instance_job(job_id: str, slug: str):
         with logfile.open("w", encoding="utf-8", errors="replace") as log:
             subprocess.Popen(cmd, cwd=str(inst_dir), stdout=log, stderr=log)
 
-        JOBS[job_id].update(status="completed", progress=100, message="Game process started")
+        JOBS[job_id].update(status="completed", progress=100, message="Game process started", finished_at=time.monotonic())
     except Exception as e:
-        JOBS[job_id].update(status="failed", message=str(e))
+        if java_future is not None and not java_future.cancel():
+            # Already running: let it finish (the JRE is reused next launch) but don't lose its errors
+            java_future.add_done_callback(_log_preflight_error)
+        JOBS[job_id].update(status="failed", message=str(e), finished_at=time.monotonic())
 
 
 @router.post("/api/instances/{slug}/launch", response_class=HTMLResponse)
-async def launch_instance(slug: str, background_tasks: BackgroundTasks):
+def launch_instance(slug: str):
     # Only launching requires sign-in. If not logged in, show an inline prompt.
+    # Plain `def`: _auth_status may block on a token refresh, so keep it off the event loop
     settings = get_settings()
     status = _auth_status(settings)
     if not status.get("logged_in"):
@@ -800,49 +1274,74 @@ async def launch_instance(slug: str, background_tasks: BackgroundTasks):
         )
         return HTMLResponse(content=html)
 
-    job_id = secrets.token_hex(8)
-    JOBS[job_id] = {"status": "queued", "progress": 0, "message": "Queued"}
-    background_tasks.add_task(_launch_instance_job, job_id, slug)
+    job_id = _new_job()
+    _submit_job(LAUNCH_POOL, job_id, _launch_instance_job, slug)
     html = f'''<div class="text-sm text-slate-300">Launching…
       <div id="launch-{job_id}" hx-get="/api/jobs/{job_id}" hx-trigger="load, every 1s" hx-swap="innerHTML"></div>
     </div>'''
     return HTMLResponse(content=html)
 
 
-def _instance_card_html(d: Path, meta: dict) -> str:
-    name = meta.get("instance_name") or d.name
-    slug = meta.get("slug") or d.name
-    created = meta.get("created_at") or ""
-    return f'''<div class="border border-slate-800 rounded-md p-4 bg-slate-900/40">
-      <div class="font-medium">{name}</div>
-      <div class="text-xs text-slate-400">{slug}</div>
-      <div class="text-xs text-slate-500 mt-1">{created}</div>
-      <div class="mt-2 text-sm text-slate-400">Install folder: <span class="font-mono">{d}</span></div>
-      <form class="mt-3" hx-post="/api/instances/{slug}/launch" hx-target="#launch-progress-{slug}" hx-swap="innerHTML">
+_CARD_TPL = '''<div class="border border-slate-800 rounded-md p-4 bg-slate-900/40">
+      <div class="font-medium">%(name)s</div>
+      <div class="text-xs text-slate-400">%(slug)s</div>
+      <div class="text-xs text-slate-500 mt-1">%(created)s</div>
+      <div class="mt-2 text-sm text-slate-400">Install folder: <span class="font-mono">%(path)s</span></div>
+      <form class="mt-3" hx-post="/api/instances/%(slug)s/launch" hx-target="#launch-progress-%(slug)s" hx-swap="innerHTML">
         <button type="submit" class="px-3 py-1.5 rounded border border-slate-700 hover:bg-slate-800" hx-swap-oob="true">Launch</button>
       </form>
       <div class="mt-2">
-        <a href="/instances/{slug}" class="text-sm px-3 py-1.5 rounded border border-slate-700 hover:bg-slate-800">Manage</a>
+        <a href="/instances/%(slug)s" class="text-sm px-3 py-1.5 rounded border border-slate-700 hover:bg-slate-800">Manage</a>
       </div>
-      <div id="launch-progress-{slug}" class="mt-2 text-xs text-slate-400"></div>
+      <div id="launch-progress-%(slug)s" class="mt-2 text-xs text-slate-400"></div>
     </div>'''
 
 
+def _instance_card_html(d: Path, meta: dict) -> str:
+    # Names and paths come from disk/instance.json; escape before interpolating
+    return _CARD_TPL % {
+        "name": escape(meta.get("instance_name") or d.name),
+        "slug": escape(meta.get("slug") or d.name),
+        "created": escape(meta.get("created_at") or ""),
+        "path": escape(str(d)),
+    }
+
+
+# Parsed instance.json per path, reused while the file's mtime is unchanged
+_META_CACHE: dict[str, tuple[int, dict]] = {}
+
+
+def _load_instance_meta(info_path: Path) -> dict:
+    """Return the parsed instance.json at `info_path` ({} if missing or invalid).
+
+    The result is shared between callers and must not be mutated.
+    """
+    key = str(info_path)
+    try:
+        mtime = os.stat(key).st_mtime_ns
+    except OSError:
+        _META_CACHE.pop(key, None)
+        return {}
+    hit = _META_CACHE.get(key)
+    if hit is not None and hit[0] == mtime:
+        return hit[1]
+    try:
+        meta = orjson.loads(info_path.read_bytes())
+    except Exception:
+        meta = {}
+    if not isinstance(meta, dict):
+        meta = {}
+    _META_CACHE[key] = (mtime, meta)
+    return meta
+
+
 @router.get("/api/instances", response_class=HTMLResponse)
 async def list_instances():
     cards = []
     if INSTANCES_DIR.exists():
-        for d in sorted(INSTANCES_DIR.iterdir()):
-            if not d.is_dir():
-                continue
-            meta = {}
-            info_path = d / "instance.json"
-            if info_path.exists():
-                try:
-                    meta = json.loads(info_path.read_text("utf-8"))
-                except Exception:
-                    meta = {}
-            cards.append(_instance_card_html(d, meta))
+        for name in _scan_names(INSTANCES_DIR, dirs=True):
+            d = INSTANCES_DIR / name
+            cards.append(_instance_card_html(d, _load_instance_meta(d / "instance.json")))
     html = (
         '<div class="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-3">' + ("".join(cards) or '<div class="text-slate-400">No instances installed yet.</div>') + "</div>"
     )
@@ -850,94 +1349,121 @@ async def list_instances():
 
 
 # ---------------- Instance Management (mods, updates) ----------------
+# The mod/pack/world endpoints below are plain `def`: they are all filesystem work
+# (scandir, rename, unlink, upload copies), so FastAPI runs them on its threadpool
+# and the event loop stays free for job polls.
 
 def _read_instance(slug: str) -> tuple[Path, dict]:
     inst_dir = INSTANCES_DIR / slug
     if not inst_dir.exists():
         raise HTTPException(status_code=404, detail="Instance not found")
-    meta = {}
-    info_path = inst_dir / "instance.json"
-    if info_path.exists():
-        try:
-            meta = json.loads(info_path.read_text("utf-8"))
-        except Exception:
-            meta = {}
-    return inst_dir, meta
+    return inst_dir, _load_instance_meta(inst_dir / "instance.json")
 
 
-def _instance_mods(inst_dir: Path) -> list[dict]:
-    mods_dir = inst_dir / "mods"
-    mods_dir.mkdir(parents=True, exist_ok=True)
-    items = []
-    for p in sorted(mods_dir.glob("*")):
-        if not p.is_file():
-            continue
-        name = p.name
-        enabled = not name.endswith(".disabled")
-        items.append({"name": name, "enabled": enabled})
-    return items
+# modrinth.index.json dependency key -> Modrinth loader name, in launch priority order
+_INDEX_LOADER_DEPS = (
+    ("fabric-loader", "fabric"),
+    ("quilt-loader", "quilt"),
+    ("forge", "forge"),
+    ("neoforge", "neoforge"),
+)
+
+
+def _instance_loader_context(inst_dir: Path) -> tuple[Optional[str], Optional[str]]:
+    """(Minecraft version, Modrinth loader name) from the instance's pack index.
+
+    Either is None when the index or its dependency entry is missing.
+    """
+    try:
+        index = orjson.loads((inst_dir / "modrinth.index.json").read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return None, None
+    deps = index.get("dependencies") if isinstance(index, dict) else None
+    if not isinstance(deps, dict):
+        return None, None
+    loader = next((name for key, name in _INDEX_LOADER_DEPS if deps.get(key)), None)
+    return deps.get("minecraft") or None, loader
+
+
+def _save_upload(file: UploadFile, target: Path) -> None:
+    """Copy an uploaded file to `target` in chunks instead of buffering it whole."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    src = file.file
+    src.seek(0)
+    with target.open("wb") as out:
+        shutil.copyfileobj(src, out, COPY_CHUNK_SIZE)
+
+
+def _scan_names(dir_path: Path, dirs: bool = False, q: str = "") -> list[str]:
+    """Sorted names of the files (or directories) directly inside `dir_path`.
+
+    A non-empty `q` keeps only names containing it (case-insensitive); it is
+    applied while scanning so filtered-out entries are never type-checked or sorted.
+    """
+    ql = q.lower()
+    with os.scandir(dir_path) as it:
+        return sorted(
+            e.name for e in it if (not ql or ql in e.name.lower()) and (e.is_dir() if dirs else e.is_file())
+        )
+
 
+def _instance_mods(inst_dir: Path, q: str = "") -> list[dict]:
+    return _packs_list(inst_dir / "mods", q)
 
-def _packs_list(dir_path: Path) -> list[dict]:
+
+def _packs_list(dir_path: Path, q: str = "") -> list[dict]:
     dir_path.mkdir(parents=True, exist_ok=True)
-    items = []
-    for p in sorted(dir_path.glob("*")):
-        if not p.is_file():
-            continue
-        name = p.name
-        enabled = not name.endswith(".disabled")
-        items.append({"name": name, "enabled": enabled})
-    return items
+    return [{"name": name, "enabled": not name.endswith(".disabled")} for name in _scan_names(dir_path, q=q)]
 
 
-def _list_html(slug: str, base: str, items: list[dict], extra_vals: Optional[dict] = None) -> str:
-    rows = []
-    for it in items:
-        name = it["name"]
-        enabled = it["enabled"]
-        toggle_label = "Disable" if enabled else "Enable"
-        vals = {"filename": name}
-        if extra_vals:
-            vals.update(extra_vals)
-        hx_vals = json.dumps(vals)
-        rows.append(
-            f'''<div class="flex items-center justify-between py-1">
+_LIST_ROW_TPL = '''<div class="flex items-center justify-between py-1">
   <div class="font-mono text-sm truncate w-2/3">{name}</div>
   <div class="flex items-center gap-2">
     <button class="text-xs px-2 py-1 rounded border border-slate-700 hover:bg-slate-800" hx-post="/api/instances/{slug}/{base}/toggle" hx-vals='{hx_vals}' hx-target="#{base}-list" hx-swap="outerHTML">{toggle_label}</button>
     <button class="text-xs px-2 py-1 rounded border border-red-800 text-red-200 hover:bg-red-900" hx-post="/api/instances/{slug}/{base}/delete" hx-vals='{hx_vals}' hx-target="#{base}-list" hx-swap="outerHTML">Delete</button>
   </div>
 </div>'''
-        )
-    body = "\n".join(rows) or '<div class="text-slate-400 text-sm">Nothing here yet.</div>'
+
+
+def _list_html(slug: str, base: str, items: list[dict], extra_vals: Optional[dict] = None) -> str:
+    # Only the filename differs per row, so encode the extra hx-vals keys once
+    extra = "," + orjson.dumps(extra_vals).decode()[1:-1] if extra_vals else ""
+    row = _LIST_ROW_TPL.format
+    slug = escape(slug)
+    body = "\n".join(
+        [
+            row(
+                name=escape(it["name"]),
+                slug=slug,
+                base=base,
+                # escape() also covers quotes, so the JSON survives the single-quoted attribute
+                hx_vals=escape('{"filename":' + orjson.dumps(it["name"]).decode() + extra + "}"),
+                toggle_label="Disable" if it["enabled"] else "Enable",
+            )
+            for it in items
+        ]
+    ) or '<div class="text-slate-400 text-sm">Nothing here yet.</div>'
     return f'''<div id="{base}-list" class="divide-y divide-slate-800">{body}</div>'''
 
 
 @router.get("/api/instances/{slug}/mods/list", response_class=HTMLResponse)
-async def list_mods(slug: str, q: str = Query("")):
+def list_mods(slug: str, q: str = Query("")):
     inst_dir, _ = _read_instance(slug)
-    mods = _instance_mods(inst_dir)
-    if q:
-        ql = q.lower()
-        mods = [m for m in mods if ql in m["name"].lower()]
+    mods = _instance_mods(inst_dir, q)
     return HTMLResponse(_list_html(slug, "mods", mods))
 
 
 @router.post("/api/instances/{slug}/mods/upload", response_class=HTMLResponse)
-async def upload_mod(slug: str, file: UploadFile = File(...)):
+def upload_mod(slug: str, file: UploadFile = File(...)):
     inst_dir, _ = _read_instance(slug)
     if not file.filename or not file.filename.endswith(".jar"):
-        return HTMLResponse('<div class="text-red-400 text-sm">Please upload a .jar file.</div>')
-    mods_dir = inst_dir / "mods"
-    mods_dir.mkdir(parents=True, exist_ok=True)
-    target = mods_dir / file.filename
-    data = await file.read()
-    target.write_bytes(data)
+        return HTMLResponse(_HTML_NEED_JAR)
+    _save_upload(file, inst_dir / "mods" / file.filename)
     return HTMLResponse(_list_html(slug, "mods", _instance_mods(inst_dir)))
 
 
 @router.post("/api/instances/{slug}/mods/toggle", response_class=HTMLResponse)
-async def toggle_mod(slug: str, filename: str = Form(...)):
+def toggle_mod(slug: str, filename: str = Form(...)):
     inst_dir, _ = _read_instance(slug)
     p = inst_dir / "mods" / filename
     if p.exists():
@@ -950,7 +1476,7 @@ async def toggle_mod(slug: str, filename: str = Form(...)):
 
 
 @router.post("/api/instances/{slug}/mods/delete", response_class=HTMLResponse)
-async def delete_mod(slug: str, filename: str = Form(...)):
+def delete_mod(slug: str, filename: str = Form(...)):
     inst_dir, _ = _read_instance(slug)
     p = inst_dir / "mods" / filename
     try:
@@ -962,28 +1488,23 @@ async def delete_mod(slug: str, filename: str = Form(...)):
 
 
 @router.get("/api/instances/{slug}/resourcepacks/list", response_class=HTMLResponse)
-async def list_resourcepacks(slug: str, q: str = Query("")):
+def list_resourcepacks(slug: str, q: str = Query("")):
     inst_dir, _ = _read_instance(slug)
-    items = _packs_list(inst_dir / "resourcepacks")
-    if q:
-        ql = q.lower()
-        items = [x for x in items if ql in x["name"].lower()]
+    items = _packs_list(inst_dir / "resourcepacks", q)
     return HTMLResponse(_list_html(slug, "resourcepacks", items))
 
 
 @router.post("/api/instances/{slug}/resourcepacks/upload", response_class=HTMLResponse)
-async def upload_resourcepack(slug: str, file: UploadFile = File(...)):
+def upload_resourcepack(slug: str, file: UploadFile = File(...)):
     inst_dir, _ = _read_instance(slug)
     if not file.filename or not (file.filename.endswith(".zip") or file.filename.endswith(".jar")):
-        return HTMLResponse('<div class="text-red-400 text-sm">Please upload a .zip or .jar file.</div>')
-    target = (inst_dir / "resourcepacks") / file.filename
-    target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_bytes(await file.read())
+        return HTMLResponse(_HTML_NEED_ZIP_OR_JAR)
+    _save_upload(file, (inst_dir / "resourcepacks") / file.filename)
     return HTMLResponse(_list_html(slug, "resourcepacks", _packs_list(inst_dir / "resourcepacks")))
 
 
 @router.post("/api/instances/{slug}/resourcepacks/toggle", response_class=HTMLResponse)
-async def toggle_resourcepack(slug: str, filename: str = Form(...)):
+def toggle_resourcepack(slug: str, filename: str = Form(...)):
     inst_dir, _ = _read_instance(slug)
     p = (inst_dir / "resourcepacks") / filename
     if p.exists():
@@ -996,7 +1517,7 @@ async def toggle_resourcepack(slug: str, filename: str = Form(...)):
 
 
 @router.post("/api/instances/{slug}/resourcepacks/delete", response_class=HTMLResponse)
-async def delete_resourcepack(slug: str, filename: str = Form(...)):
+def delete_resourcepack(slug: str, filename: str = Form(...)):
     inst_dir, _ = _read_instance(slug)
     p = (inst_dir / "resourcepacks") / filename
     try:
@@ -1008,28 +1529,23 @@ async def delete_resourcepack(slug: str, filename: str = Form(...)):
 
 
 @router.get("/api/instances/{slug}/shaderpacks/list", response_class=HTMLResponse)
-async def list_shaderpacks(slug: str, q: str = Query("")):
+def list_shaderpacks(slug: str, q: str = Query("")):
     inst_dir, _ = _read_instance(slug)
-    items = _packs_list(inst_dir / "shaderpacks")
-    if q:
-        ql = q.lower()
-        items = [x for x in items if ql in x["name"].lower()]
+    items = _packs_list(inst_dir / "shaderpacks", q)
     return HTMLResponse(_list_html(slug, "shaderpacks", items))
 
 
 @router.post("/api/instances/{slug}/shaderpacks/upload", response_class=HTMLResponse)
-async def upload_shaderpack(slug: str, file: UploadFile = File(...)):
+def upload_shaderpack(slug: str, file: UploadFile = File(...)):
     inst_dir, _ = _read_instance(slug)
     if not file.filename or not file.filename.endswith(".zip"):
-        return HTMLResponse('<div class="text-red-400 text-sm">Please upload a .zip file.</div>')
-    target = (inst_dir / "shaderpacks") / file.filename
-    target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_bytes(await file.read())
+        return HTMLResponse(_HTML_NEED_ZIP)
+    _save_upload(file, (inst_dir / "shaderpacks") / file.filename)
     return HTMLResponse(_list_html(slug, "shaderpacks", _packs_list(inst_dir / "shaderpacks")))
 
 
 @router.post("/api/instances/{slug}/shaderpacks/toggle", response_class=HTMLResponse)
-async def toggle_shaderpack(slug: str, filename: str = Form(...)):
+def toggle_shaderpack(slug: str, filename: str = Form(...)):
     inst_dir, _ = _read_instance(slug)
     p = (inst_dir / "shaderpacks") / filename
     if p.exists():
@@ -1042,7 +1558,7 @@ async def toggle_shaderpack(slug: str, filename: str = Form(...)):
 
 
 @router.post("/api/instances/{slug}/shaderpacks/delete", response_class=HTMLResponse)
-async def delete_shaderpack(slug: str, filename: str = Form(...)):
+def delete_shaderpack(slug: str, filename: str = Form(...)):
     inst_dir, _ = _read_instance(slug)
     p = (inst_dir / "shaderpacks") / filename
     try:
@@ -1057,55 +1573,46 @@ def _list_worlds(inst_dir: Path) -> list[str]:
     saves = inst_dir / "saves"
     if not saves.exists():
         return []
-    worlds = []
-    for d in sorted(saves.iterdir()):
-        if d.is_dir():
-            worlds.append(d.name)
-    return worlds
+    return _scan_names(saves, dirs=True)
 
 
 @router.get("/api/instances/{slug}/worlds", response_class=HTMLResponse)
-async def list_worlds(slug: str):
+def list_worlds(slug: str):
     inst_dir, _ = _read_instance(slug)
     worlds = _list_worlds(inst_dir)
     if not worlds:
-        return HTMLResponse('<select id="world-select" class="w-full px-2 py-1.5 rounded bg-slate-900 border border-slate-800 text-sm"><option value="">No worlds found</option></select>')
-    opts = "".join([f'<option value="{w}">{w}</option>' for w in worlds])
+        return HTMLResponse(_HTML_NO_WORLDS)
+    opts = "".join([f'<option value="{w}">{w}</option>' for w in map(escape, worlds)])
     html = f'<select id="world-select" name="world" class="w-full px-2 py-1.5 rounded bg-slate-900 border border-slate-800 text-sm">{opts}</select>'
     return HTMLResponse(html)
 
 
-def _datapacks_list(inst_dir: Path, world: str) -> list[dict]:
+def _datapacks_list(inst_dir: Path, world: str, q: str = "") -> list[dict]:
     dp_dir = inst_dir / "saves" / world / "datapacks"
-    return _packs_list(dp_dir)
+    return _packs_list(dp_dir, q)
 
 
 @router.get("/api/instances/{slug}/datapacks/list", response_class=HTMLResponse)
-async def list_datapacks(slug: str, world: str = Query(""), q: str = Query("")):
+def list_datapacks(slug: str, world: str = Query(""), q: str = Query("")):
     inst_dir, _ = _read_instance(slug)
     if not world:
-        return HTMLResponse('<div class="text-slate-400 text-sm">Select a world to view datapacks.</div>')
-    items = _datapacks_list(inst_dir, world)
-    if q:
-        ql = q.lower()
-        items = [x for x in items if ql in x["name"].lower()]
+        return HTMLResponse(_HTML_SELECT_WORLD)
+    items = _datapacks_list(inst_dir, world, q)
     return HTMLResponse(_list_html(slug, "datapacks", items, extra_vals={"world": world}))
 
 
 @router.post("/api/instances/{slug}/datapacks/upload", response_class=HTMLResponse)
-async def upload_datapack(slug: str, world: str = Form(...), file: UploadFile = File(...)):
+def upload_datapack(slug: str, world: str = Form(...), file: UploadFile = File(...)):
     inst_dir, _ = _read_instance(slug)
     if not file.filename or not file.filename.endswith(".zip"):
-        return HTMLResponse('<div class="text-red-400 text-sm">Please upload a .zip file.</div>')
-    target = inst_dir / "saves" / world / "datapacks" / file.filename
-    target.parent.mkdir(parents=True, exist_ok=True)
-    target.write_bytes(await file.read())
+        return HTMLResponse(_HTML_NEED_ZIP)
+    _save_upload(file, inst_dir / "saves" / world / "datapacks" / file.filename)
     items = _datapacks_list(inst_dir, world)
     return HTMLResponse(_list_html(slug, "datapacks", items, extra_vals={"world": world}))
 
 
 @router.post("/api/instances/{slug}/datapacks/delete", response_class=HTMLResponse)
-async def delete_datapack(slug: str, filename: str = Form(...), world: str = Form(...)):
+def delete_datapack(slug: str, filename: str = Form(...), world: str = Form(...)):
     inst_dir, _ = _read_instance(slug)
     p = inst_dir / "saves" / world / "datapacks" / filename
     try:
@@ -1117,7 +1624,7 @@ async def delete_datapack(slug: str, filename: str = Form(...), world: str = For
 
 
 @router.post("/api/instances/{slug}/datapacks/toggle", response_class=HTMLResponse)
-async def toggle_datapack(slug: str, filename: str = Form(...), world: str = Form(...)):
+def toggle_datapack(slug: str, filename: str = Form(...), world: str = Form(...)):
     inst_dir, _ = _read_instance(slug)
     p = inst_dir / "saves" / world / "datapacks" / filename
     if p.exists():
@@ -1132,15 +1639,16 @@ async def toggle_datapack(slug: str, filename: str = Form(...), world: str = For
 @router.get("/instances/{slug}/catalog", response_class=HTMLResponse)
 async def instance_catalog_page(request: Request, slug: str):
     _, meta = _read_instance(slug)
-    return templates.TemplateResponse(
-        "instance_catalog.html",
-        {"request": request, "slug": slug, "meta": meta},
-    )
+    return render("instance_catalog.html", {"slug": slug, "meta": meta})
 
 
 @router.get("/api/instances/{slug}/catalog/search", response_class=HTMLResponse)
-async def catalog_search(slug: str, q: str = Query(""), type: str = Query("mod")):
-    settings = get_settings()
+async def catalog_search(
+    slug: str,
+    q: str = Query(""),
+    type: str = Query("mod"),
+    client: ModrinthClient = Depends(get_modrinth),
+):
     type_map = {
         "mod": "mod",
         "resourcepack": "resourcepack",
@@ -1149,12 +1657,11 @@ async def catalog_search(slug: str, q: str = Query(""), type: str = Query("mod")
     }
     proj_type = type_map.get(type, "mod")
     items = []
-    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
-        facets = [[f"project_type:{proj_type}"]]
-        projects = await client.search_projects(q, facets=facets, limit=20)
+    facets = ((_PROJECT_TYPE_FACETS[proj_type],),)
+    projects = await client.search_projects(q, limit=20, facets=facets)
     for p in projects:
-        title = p.get("title") or p.get("slug")
-        slug_or_id = p.get("slug") or p.get("project_id") or p.get("project_id")
+        title = escape(p.get("title") or p.get("slug"))
+        slug_or_id = escape(p.get("slug") or p.get("project_id") or "")
         view_url = f"/projects/{slug_or_id}"
         add_endpoint = {
             "mod": "/api/instances/{slug}/mods/add_modrinth",
@@ -1168,7 +1675,7 @@ async def catalog_search(slug: str, q: str = Query(""), type: str = Query("mod")
   <div class="font-medium truncate">{title}</div>
   <div class="mt-2 flex items-center gap-2">
     <a href="{view_url}" target="_blank" class="text-xs px-2 py-1 rounded border border-slate-700 hover:bg-slate-800">View</a>
-    <button class="text-xs px-2 py-1 rounded bg-emerald-600 hover:bg-emerald-500 text-white" hx-post="{add_endpoint.format(slug=slug)}" hx-vals='{{"id_or_slug": "{slug_or_id}"}}' hx-target="#catalog-flash" hx-swap="innerHTML"{hx_include}>Add</button>
+    <button class="text-xs px-2 py-1 rounded bg-emerald-600 hover:bg-emerald-500 text-white" hx-post="{add_endpoint.format(slug=escape(slug))}" hx-vals='{{"id_or_slug": "{slug_or_id}"}}' hx-target="#catalog-flash" hx-swap="innerHTML"{hx_include}>Add</button>
   </div>
 </div>'''
         )
@@ -1176,160 +1683,129 @@ async def catalog_search(slug: str, q: str = Query(""), type: str = Query("mod")
     return HTMLResponse(html)
 
 
-def _download_best_version_file(id_or_slug: str, target_dir: Path, accept_ext: tuple[str, ...]) -> bool:
-    """Download the first matching file extension from the latest versions of a Modrinth project.
-    Synchronous implementation using httpx to avoid event loop nesting.
-    """
-    settings = get_settings()
-    headers = {"User-Agent": settings.modrinth_user_agent, "Accept": "application/json"}
-    with httpx.Client(timeout=120.0, follow_redirects=True, headers=headers) as c:
-        r = c.get(f"https://api.modrinth.com/v2/project/{id_or_slug}/version")
-        r.raise_for_status()
-        versions = r.json() or []
-        chosen = None
-        for v in versions:
-            v_loaders = v.get("loaders", [])
-            v_games = v.get("game_versions", [])
-            if v_games and v_loaders:
-                chosen = v
-                break
-        if not chosen and versions:
-            chosen = versions[0]
-        if not chosen:
-            return False
-        # Find a .jar file
-        f_url = None
-        fn_out = None
-        for f in chosen.get("files", []):
-            url = f.get("url") or (f.get("downloads") or [None])[0]
-            fn = f.get("filename") or ""
-            if url and fn.endswith(accept_ext):
-                f_url = url
-                fn_out = fn
-                break
-        if not f_url:
-            return False
-        target_dir.mkdir(parents=True, exist_ok=True)
-        dest = target_dir / (fn_out or ((chosen.get("version_number") or "mod") + ".jar"))
-        with c.stream("GET", f_url) as resp:
-            resp.raise_for_status()
-            with dest.open("wb") as f:
-                for chunk in resp.iter_bytes():
-                    f.write(chunk)
-        return True
+def _pick_version_file(version: dict, accept_ext: tuple[str, ...]) -> Optional[tuple[str, str]]:
+    """Return (url, filename) of the first file in `version` with an accepted extension."""
+    return next(
+        (
+            (url, fn)
+            for f in version.get("files", ())
+            if (fn := f.get("filename") or "").endswith(accept_ext)
+            and (url := f.get("url") or (f.get("downloads") or [None])[0])
+        ),
+        None,
+    )
+
+
+async def _download_best_version_file(
+    client: ModrinthClient, id_or_slug: str, target_dir: Path, accept_ext: tuple[str, ...]
+) -> bool:
+    """Download the first matching file extension from the latest versions of a Modrinth project."""
+    versions = await client.get_project_versions(id_or_slug) or []
+    chosen = next(
+        (v for v in versions if v.get("game_versions") and v.get("loaders")),
+        versions[0] if versions else None,
+    )
+    if not chosen:
+        return False
+    picked = _pick_version_file(chosen, accept_ext)
+    if not picked:
+        return False
+    target_dir.mkdir(parents=True, exist_ok=True)
+    await client.download_file(picked[0], target_dir / picked[1], COPY_CHUNK_SIZE)
+    return True
 
 
 @router.post("/api/instances/{slug}/resourcepacks/add_modrinth", response_class=HTMLResponse)
-async def add_resourcepack_from_modrinth(slug: str, id_or_slug: str = Form(...)):
+async def add_resourcepack_from_modrinth(
+    slug: str,
+    id_or_slug: str = Form(...),
+    client: ModrinthClient = Depends(get_modrinth),
+):
     inst_dir, _ = _read_instance(slug)
-    ok = _download_best_version_file(id_or_slug, inst_dir / "resourcepacks", (".zip", ".jar"))
+    ok = await _download_best_version_file(client, id_or_slug, inst_dir / "resourcepacks", (".zip", ".jar"))
     if ok:
-        return HTMLResponse('<div class="text-emerald-400 text-sm">Resource pack added.</div>')
-    return HTMLResponse('<div class="text-red-400 text-sm">Failed to add resource pack.</div>')
+        return HTMLResponse(_HTML_RESOURCEPACK_ADDED)
+    return HTMLResponse(_HTML_RESOURCEPACK_FAILED)
 
 
 @router.post("/api/instances/{slug}/shaderpacks/add_modrinth", response_class=HTMLResponse)
-async def add_shaderpack_from_modrinth(slug: str, id_or_slug: str = Form(...)):
+async def add_shaderpack_from_modrinth(
+    slug: str,
+    id_or_slug: str = Form(...),
+    client: ModrinthClient = Depends(get_modrinth),
+):
     inst_dir, _ = _read_instance(slug)
-    ok = _download_best_version_file(id_or_slug, inst_dir / "shaderpacks", (".zip",))
+    ok = await _download_best_version_file(client, id_or_slug, inst_dir / "shaderpacks", (".zip",))
     if ok:
-        return HTMLResponse('<div class="text-emerald-400 text-sm">Shader pack added.</div>')
-    return HTMLResponse('<div class="text-red-400 text-sm">Failed to add shader pack.</div>')
+        return HTMLResponse(_HTML_SHADERPACK_ADDED)
+    return HTMLResponse(_HTML_SHADERPACK_FAILED)
 
 
 @router.post("/api/instances/{slug}/datapacks/add_modrinth", response_class=HTMLResponse)
-async def add_datapack_from_modrinth(slug: str, id_or_slug: str = Form(...), world: str = Form(...)):
+async def add_datapack_from_modrinth(
+    slug: str,
+    id_or_slug: str = Form(...),
+    world: str = Form(...),
+    client: ModrinthClient = Depends(get_modrinth),
+):
     inst_dir, _ = _read_instance(slug)
     target = inst_dir / "saves" / world / "datapacks"
-    ok = _download_best_version_file(id_or_slug, target, (".zip",))
+    ok = await _download_best_version_file(client, id_or_slug, target, (".zip",))
     if ok:
-        return HTMLResponse('<div class="text-emerald-400 text-sm">Data pack added.</div>')
-    return HTMLResponse('<div class="text-red-400 text-sm">Failed to add data pack.</div>')
+        return HTMLResponse(_HTML_DATAPACK_ADDED)
+    return HTMLResponse(_HTML_DATAPACK_FAILED)
 
 
 @router.post("/api/instances/{slug}/mods/add_modrinth", response_class=HTMLResponse)
-async def add_mod_from_modrinth(slug: str, id_or_slug: str = Form(...)):
+async def add_mod_from_modrinth(
+    slug: str,
+    id_or_slug: str = Form(...),
+    client: ModrinthClient = Depends(get_modrinth),
+):
     inst_dir, _ = _read_instance(slug)
     mc_ver, loader = _instance_loader_context(inst_dir)
-    settings = get_settings()
-    # Pick best compatible version and download primary .jar
-    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
+    # Pick best compatible version (filtered by Modrinth) and download primary .jar
+    versions = await client.get_project_versions(
+        id_or_slug,
+        loaders=[loader] if loader else None,
+        game_versions=[mc_ver] if mc_ver else None,
+    )
+    if not versions and (loader or mc_ver):
+        # Nothing matches the instance; fall back to the latest version overall
         versions = await client.get_project_versions(id_or_slug)
-    chosen = None
-    for v in versions:
-        v_loaders = v.get("loaders", [])
-        v_games = v.get("game_versions", [])
-        if mc_ver and mc_ver not in v_games:
-            continue
-        if loader and loader not in v_loaders:
-            continue
-        chosen = v
-        break
-    if not chosen and versions:
-        chosen = versions[0]
+    chosen = versions[0] if versions else None
     if not chosen:
-        return HTMLResponse('<div class="text-red-400 text-sm">No compatible files found.</div>')
-    # Find a .jar file
-    f_url = None
-    fn_out = None
-    for f in chosen.get("files", []):
-        url = f.get("url") or (f.get("downloads") or [None])[0]
-        fn = f.get("filename") or ""
-        if url and fn.endswith(".jar"):
-            f_url = url
-            fn_out = fn
-            break
-    if not f_url:
-        return HTMLResponse('<div class="text-red-400 text-sm">No downloadable jar found.</div>')
+        return HTMLResponse(_HTML_NO_COMPATIBLE)
+    picked = _pick_version_file(chosen, (".jar",))
+    if not picked:
+        return HTMLResponse(_HTML_NO_JAR)
     mods_dir = inst_dir / "mods"
     mods_dir.mkdir(parents=True, exist_ok=True)
-    target = mods_dir / (fn_out or ((chosen.get("version_number") or "mod") + ".jar"))
-    with httpx.Client(timeout=60.0, follow_redirects=True) as client2:
-        with client2.stream("GET", f_url) as r:
-            r.raise_for_status()
-            with target.open("wb") as f_out:
-                for chunk in r.iter_bytes():
-                    f_out.write(chunk)
-    return HTMLResponse('<div class="text-emerald-400 text-sm">Mod added.</div>')
+    await client.download_file(picked[0], mods_dir / picked[1], COPY_CHUNK_SIZE)
+    return HTMLResponse(_HTML_MOD_ADDED)
 
 @router.get("/instances/{slug}", response_class=HTMLResponse)
 async def instance_detail_page(request: Request, slug: str):
     try:
         inst_dir, meta = _read_instance(slug)
-        return templates.TemplateResponse(
-            "instance_manage.html",
-            {
-                "request": request,
-                "slug": slug,
-                "meta": meta,
-            },
-        )
+        return render("instance_manage.html", {"slug": slug, "meta": meta})
     except HTTPException as e:
         if e.status_code != 404:
             raise
         # Friendly 404: show available instance slugs and a back link
         options = []
         if INSTANCES_DIR.exists():
-            for d in sorted(INSTANCES_DIR.iterdir()):
-                if d.is_dir():
-                    options.append(f'<li><a class="text-emerald-400 hover:underline" href="/instances/{d.name}">{d.name}</a></li>')
+            for name in map(escape, _scan_names(INSTANCES_DIR, dirs=True)):
+                options.append(f'<li><a class="text-emerald-400 hover:underline" href="/instances/{name}">{name}</a></li>')
         body = "".join(options) or '<li class="text-slate-400">No instances found.</li>'
         html = f'''<div class="space-y-3">
-  <div class="text-red-400">Instance not found: <span class="font-mono">{slug}</span></div>
+  <div class="text-red-400">Instance not found: <span class="font-mono">{escape(slug)}</span></div>
   <div><a href="/installed" class="text-sm px-3 py-1.5 rounded border border-slate-700 hover:bg-slate-800">← Back to Installed</a></div>
   <div class="text-sm text-slate-300">Available instances:</div>
   <ul class="list-disc pl-5 text-sm">{body}</ul>
 </div>'''
         return HTMLResponse(content=html, status_code=404)
 
-# Optional dependency: Microsoft account login via minecraft-launcher-lib
-try:
-    from minecraft_launcher_lib import microsoft_account as ms_account  # type: ignore
-    from minecraft_launcher_lib import exceptions as mll_exc  # type: ignore
-except Exception:  # pragma: no cover
-    ms_account = None  # type: ignore
-    mll_exc = None  # type: ignore
-
 from cryptography.fernet import Fernet
 from typing import Optional
 
@@ -1339,10 +1815,36 @@ AUTH_DIR.mkdir(parents=True, exist_ok=True)
 KEY_PATH = AUTH_DIR / "secret.key"
 AUTH_FILE = AUTH_DIR / "auth.enc"
 
-# In-memory login flow state (PKCE)
-AUTH_FLOW: dict[str, Optional[str]] = {"state": None, "code_verifier": None, "redirect_uri": None}
+# In-flight login flows (PKCE), keyed by OAuth state so concurrent sign-ins don't
+# clobber each other. Entries expire after AUTH_FLOW_TTL seconds.
+AUTH_FLOW_TTL = 300.0
+AUTH_FLOWS: dict[str, tuple[float, dict[str, str]]] = {}
+
+
+def _start_auth_flow(state: str, code_verifier: str, redirect_uri: str) -> None:
+    now = time.monotonic()
+    for key in [k for k, (expires, _) in AUTH_FLOWS.items() if expires <= now]:
+        AUTH_FLOWS.pop(key, None)
+    AUTH_FLOWS[state] = (now + AUTH_FLOW_TTL, {"state": state, "code_verifier": code_verifier, "redirect_uri": redirect_uri})
+
+
+def _take_auth_flow(state: Optional[str]) -> Optional[dict[str, str]]:
+    """Remove and return the unexpired flow started with `state`, if any.
+
+    The exact-match lookup is the CSRF check: an unknown state finds no flow.
+    """
+    hit = AUTH_FLOWS.pop(state, None) if state else None
+    if hit is None or hit[0] <= time.monotonic():
+        return None
+    return hit[1]
 
+@lru_cache(maxsize=1)
 def _get_fernet() -> Fernet:
+    """Return the process-wide Fernet instance, loading the key on first use."""
+    return _load_fernet()
+
+
+def _load_fernet() -> Fernet:
     """Return a Fernet instance using a locally stored key (generated if missing)."""
     if not KEY_PATH.exists():
         try:
@@ -1364,116 +1866,234 @@ def _get_fernet() -> Fernet:
         KEY_PATH.write_bytes(key)
         return Fernet(key)
 
+# Decrypted auth payload keyed by the file's (mtime_ns, size), so repeated
+# status polls skip the read + Fernet decrypt while the file is unchanged
+_AUTH_PAYLOAD_CACHE: Optional[tuple[tuple[int, int], dict]] = None
+
+
+def _auth_file_sig() -> Optional[tuple[int, int]]:
+    try:
+        st = AUTH_FILE.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 def _save_auth_payload(data: dict) -> None:
+    global _AUTH_PAYLOAD_CACHE
+    _AUTH_PAYLOAD_CACHE = None
+    _AUTH_STATUS_CACHE.clear()
     try:
         f = _get_fernet()
-        payload = json.dumps(data).encode("utf-8")
+        payload = orjson.dumps(data)
         token = f.encrypt(payload)
         AUTH_FILE.write_bytes(token)
         try:
             AUTH_FILE.chmod(0o600)
         except Exception:
             pass
+        sig = _auth_file_sig()
+        if sig is not None:
+            _AUTH_PAYLOAD_CACHE = (sig, dict(data))
     except Exception:
         pass
 
 def _load_auth_payload() -> Optional[dict]:
-    if not AUTH_FILE.exists():
+    global _AUTH_PAYLOAD_CACHE
+    sig = _auth_file_sig()
+    if sig is None:
         return None
+    cached = _AUTH_PAYLOAD_CACHE
+    if cached is not None and cached[0] == sig:
+        # Callers update the dict in place, so hand out a copy
+        return dict(cached[1])
     try:
         f = _get_fernet()
         raw = AUTH_FILE.read_bytes()
         payload = f.decrypt(raw)
-        return json.loads(payload.decode("utf-8"))
+        data = orjson.loads(payload)
     except Exception:
         return None
+    _AUTH_PAYLOAD_CACHE = (sig, data)
+    return dict(data)
 
 def _delete_auth_payload() -> None:
+    global _AUTH_PAYLOAD_CACHE
+    _AUTH_PAYLOAD_CACHE = None
+    _AUTH_STATUS_CACHE.clear()
     try:
         if AUTH_FILE.exists():
             AUTH_FILE.unlink()
     except Exception:
         pass
 
+# Validated auth status per refresh token (blake2b digest), so page loads and
+# launch clicks within the TTL skip the Microsoft refresh round-trip
+AUTH_STATUS_TTL = 60.0
+_AUTH_STATUS_CACHE: dict[str, tuple[float, dict]] = {}
+_AUTH_REFRESH_LOCK = threading.Lock()
+
+
+def _token_key(refresh_token: str) -> str:
+    return hashlib.blake2b(refresh_token.encode("utf-8"), digest_size=16).hexdigest()
+
+
 def _auth_status(settings) -> dict:
     """Return current auth status. Validates refresh token if possible."""
     out = {"enabled": bool(settings.ms_client_id), "logged_in": False}
     if not settings.ms_client_id:
         return out
+    # A fresh cached status needs no refresh, so don't queue behind one in flight
     data = _load_auth_payload()
-    if not data:
-        return out
-    refresh_token = data.get("refresh_token")
-    name = data.get("name")
-    uuid = data.get("id")
-    out.update({"name": name, "id": uuid, "has_minecraft": False})
-    if not (ms_account and refresh_token):
+    refresh_token = data.get("refresh_token") if data else None
+    hit = _AUTH_STATUS_CACHE.get(_token_key(refresh_token)) if refresh_token else None
+    if hit is not None and time.monotonic() - hit[0] < AUTH_STATUS_TTL:
+        return dict(hit[1])
+    # Serialize with warm_auth and the launch job: Microsoft rotates refresh tokens,
+    # so two concurrent refreshes could leave an already-spent token on disk
+    with _AUTH_REFRESH_LOCK:
+        data = _load_auth_payload()
+        if not data:
+            return out
+        refresh_token = data.get("refresh_token")
+        name = data.get("name")
+        uuid = data.get("id")
+        out.update({"name": name, "id": uuid, "has_minecraft": False})
+        _load_mll()
+        if not (ms_account and refresh_token):
+            return out
+        now = time.monotonic()
+        hit = _AUTH_STATUS_CACHE.get(_token_key(refresh_token))
+        if hit is not None and now - hit[0] < AUTH_STATUS_TTL:
+            return dict(hit[1])
+        try:
+            # Validate refresh token and entitlements
+            refreshed = ms_account.complete_refresh(settings.ms_client_id, None, None, refresh_token)
+            # If we got here without exceptions, the account owns Minecraft (per lib semantics)
+            out["logged_in"] = True
+            out["has_minecraft"] = True
+            # Persist updated profile and (possibly rotated) refresh token
+            if isinstance(refreshed, dict):
+                data.update({
+                    "refresh_token": refreshed.get("refresh_token", refresh_token),
+                    "access_token": refreshed.get("access_token"),
+                    "name": refreshed.get("name", name),
+                    "id": refreshed.get("id", uuid),
+                })
+                _save_auth_payload(data)
+                out.update({"name": data.get("name"), "id": data.get("id")})
+            # Key by the token now on disk (it may have been rotated above)
+            _AUTH_STATUS_CACHE.clear()
+            _AUTH_STATUS_CACHE[_token_key(data.get("refresh_token") or refresh_token)] = (now, dict(out))
+        except Exception:
+            # Invalid/expired token
+            _delete_auth_payload()
+            out.update({"logged_in": False, "has_minecraft": False})
         return out
+
+def warm_auth() -> None:
+    """Load the Fernet key and validate any stored login ahead of the first request.
+
+    Meant to run once in the background at startup, so the first page load or
+    Launch click finds the key schedule built and the auth status cached.
+    """
     try:
-        # Validate refresh token and entitlements
-        refreshed = ms_account.complete_refresh(settings.ms_client_id, None, None, refresh_token)
-        # If we got here without exceptions, the account owns Minecraft (per lib semantics)
-        out["logged_in"] = True
-        out["has_minecraft"] = True
-        # Persist updated profile and (possibly rotated) refresh token
-        if isinstance(refreshed, dict):
-            data.update({
-                "refresh_token": refreshed.get("refresh_token", refresh_token),
-                "access_token": refreshed.get("access_token"),
-                "name": refreshed.get("name", name),
-                "id": refreshed.get("id", uuid),
-            })
-            _save_auth_payload(data)
-            out.update({"name": data.get("name"), "id": data.get("id")})
-    except Exception:
-        # Invalid/expired token
-        _delete_auth_payload()
-        out.update({"logged_in": False, "has_minecraft": False})
-    return out
+        _get_fernet()
+        _auth_status(get_settings())
+    except Exception as e:
+        logger.debug("[Auth] Startup warm-up skipped: %s", e)
 
-def _render_account_card_html(status: dict) -> str:
-    if not status.get("enabled"):
-        return (
-            '<div class="text-sm text-amber-400">Microsoft login is not configured. '
-            'Set <span class="font-mono">MS_CLIENT_ID</span> in your .env to enable sign-in.</div>'
-        )
-    if status.get("logged_in"):
-        name = status.get("name") or "Player"
-        uuid = status.get("id") or ""
-        return f'''
+
+_ACCOUNT_CARD_DISABLED = (
+    '<div class="text-sm text-amber-400">Microsoft login is not configured. '
+    'Set <span class="font-mono">MS_CLIENT_ID</span> in your .env to enable sign-in.</div>'
+)
+_ACCOUNT_CARD_SIGNED_IN = '''
         <div class="flex items-center justify-between">
           <div>
-            <div class="font-medium">Signed in as <span class="font-mono">{name}</span></div>
-            <div class="text-xs text-slate-400">UUID: <span class="font-mono">{uuid}</span></div>
+            <div class="font-medium">Signed in as <span class="font-mono">%(name)s</span></div>
+            <div class="text-xs text-slate-400">UUID: <span class="font-mono">%(uuid)s</span></div>
           </div>
           <form hx-post="/auth/logout" hx-target="#account-panel" hx-swap="innerHTML">
             <button type="submit" class="px-3 py-1.5 rounded bg-rose-600 hover:bg-rose-500 text-white text-sm">Sign out</button>
           </form>
         </div>
         '''
+_ACCOUNT_CARD_SIGNED_OUT = (
+    '<div class="flex items-center justify-between">'
+    '<div class="text-sm text-slate-300">Not signed in</div>'
+    '<a href="/auth/login" class="px-3 py-1.5 rounded bg-emerald-600 hover:bg-emerald-500 text-white text-sm">Sign in with Microsoft</a>'
+    '</div>'
+)
+
+
+def _render_account_card_html(status: dict) -> bytes:
+    if not status.get("enabled"):
+        return _account_card_html(False, False, None, None)
+    if status.get("logged_in"):
+        return _account_card_html(True, True, status.get("name"), status.get("id"))
+    return _account_card_html(True, False, None, None)
+
+
+@lru_cache(maxsize=64)
+def _account_card_html(enabled: bool, logged_in: bool, name: Optional[str], uuid: Optional[str]) -> bytes:
+    """Encoded account card; pure in its arguments, so repeated panel loads are a cache hit."""
+    if not enabled:
+        html = _ACCOUNT_CARD_DISABLED
+    elif logged_in:
+        html = _ACCOUNT_CARD_SIGNED_IN % {"name": escape(name or "Player"), "uuid": escape(uuid or "")}
     else:
-        return (
-            '<div class="flex items-center justify-between">'
-            '<div class="text-sm text-slate-300">Not signed in</div>'
-            '<a href="/auth/login" class="px-3 py-1.5 rounded bg-emerald-600 hover:bg-emerald-500 text-white text-sm">Sign in with Microsoft</a>'
-            '</div>'
-        )
+        html = _ACCOUNT_CARD_SIGNED_OUT
+    return html.encode("utf-8")
 
 # ---------------- Microsoft Account Login & UI ----------------
 
+_HTML_SIGNED_IN = (
+    b'<div class="max-w-xl mx-auto mt-10 p-6 rounded border border-slate-300">'
+    b'<div class="text-xl font-semibold">Signed in successfully</div>'
+    b'<div class="mt-2 text-slate-700">You can now return to Cottage Launcher. This window can be closed.</div>'
+    b'<div class="mt-4"><a href="/settings" class="px-3 py-1.5 rounded bg-emerald-600 text-white">Go to Settings</a></div>'
+    b'</div>'
+)
+_HTML_AUTH_BANNER = (
+    b'<div class="bg-amber-500/20 border-b border-amber-600/40 text-amber-200 text-sm">'
+    b'<div class="max-w-7xl mx-auto px-4 py-2 flex items-center justify-between">'
+    b'<div>Not signed in. Some features may be limited. Please sign in with your Microsoft account.</div>'
+    b'<a href="/auth/login" class="px-2.5 py-1 rounded bg-amber-600 hover:bg-amber-500 text-white">Sign in</a>'
+    b'</div>'
+    b'</div>'
+)
+_HTML_AUTH_POPUP = (
+    b'<div class="fixed inset-0 z-50 flex items-center justify-center">'
+    b'  <div class="absolute inset-0 bg-black/60" onclick="this.parentElement.remove()"></div>'
+    b'  <div class="relative bg-slate-800 border border-slate-700 rounded-lg p-5 w-[28rem] shadow-xl">'
+    b'    <div class="text-lg font-semibold">Sign in required</div>'
+    b'    <div class="mt-2 text-sm text-slate-300">To download and launch modpacks, please sign in with your Microsoft account that owns Minecraft.</div>'
+    b'    <div class="mt-4 flex items-center justify-end gap-2">'
+    b'      <button class="text-xs px-2 py-1 rounded border border-slate-600 hover:bg-slate-700" onclick="document.getElementById(\'auth-modal\').remove()">Later</button>'
+    b'      <a href="/auth/login" class="px-3 py-1.5 rounded bg-emerald-600 hover:bg-emerald-500 text-white">Sign in</a>'
+    b'    </div>'
+    b'  </div>'
+    b'</div>'
+)
+
+
+# Logged-in banner/popup polls get this one shared, stateless response
+_EMPTY_HTML_RESPONSE = HTMLResponse(b"")
+
+
 @router.get("/auth/login")
 async def auth_login(request: Request):
     settings = get_settings()
     if not settings.ms_client_id:
         return HTMLResponse('<div class="text-amber-400">MS_CLIENT_ID is not configured.</div>', status_code=500)
+    _load_mll()
     if not ms_account:
         return HTMLResponse('<div class="text-amber-400">minecraft-launcher-lib is not available.</div>', status_code=500)
     redirect_uri = f"http://localhost:{settings.app_port}/auth/callback"
     try:
         login_url, state, code_verifier = ms_account.get_secure_login_data(settings.ms_client_id, redirect_uri)
-        AUTH_FLOW["state"] = state
-        AUTH_FLOW["code_verifier"] = code_verifier
-        AUTH_FLOW["redirect_uri"] = redirect_uri
+        _start_auth_flow(state, code_verifier, redirect_uri)
         return RedirectResponse(login_url, status_code=302)
     except Exception as e:
         return HTMLResponse(f'<div class="text-rose-400">Failed to start login: {str(e)}</div>', status_code=500)
@@ -1481,6 +2101,7 @@ async def auth_login(request: Request):
 @router.get("/auth/callback")
 async def auth_callback(request: Request):
     settings = get_settings()
+    _load_mll()
     if not settings.ms_client_id or not ms_account:
         return HTMLResponse('<div class="text-amber-400">Login is not available.</div>', status_code=500)
     # Parse auth code and verify state
@@ -1488,15 +2109,15 @@ async def auth_callback(request: Request):
         params = request.query_params
         code = params.get("code")
         state = params.get("state")
-        expected_state = AUTH_FLOW.get("state")
         if not code:
             raise ValueError("Missing 'code' in callback URL")
-        if expected_state and state != expected_state:
-            raise AssertionError("State mismatch; please try signing in again")
-        redirect_uri = AUTH_FLOW.get("redirect_uri") or f"http://localhost:{settings.app_port}/auth/callback"
+        flow = _take_auth_flow(state)
+        if flow is None:
+            raise AssertionError("State mismatch or expired login; please try signing in again")
+        redirect_uri = flow["redirect_uri"]
         # Complete login with PKCE using the stored redirect_uri
         try:
-            data = ms_account.complete_login(settings.ms_client_id, None, redirect_uri, code, AUTH_FLOW.get("code_verifier"))
+            data = ms_account.complete_login(settings.ms_client_id, None, redirect_uri, code, flow["code_verifier"])
         except Exception as e:
             # Map known library exceptions to friendly messages
             if mll_exc:
@@ -1526,25 +2147,11 @@ async def auth_callback(request: Request):
                 "id": data.get("id"),
             }
             _save_auth_payload(payload)
-        # Clear flow state
-        AUTH_FLOW["state"] = None
-        AUTH_FLOW["code_verifier"] = None
-        AUTH_FLOW["redirect_uri"] = None
         # Friendly success page (user is in system browser)
-        html = (
-            '<div class="max-w-xl mx-auto mt-10 p-6 rounded border border-slate-300">'
-            '<div class="text-xl font-semibold">Signed in successfully</div>'
-            '<div class="mt-2 text-slate-700">You can now return to Cottage Launcher. This window can be closed.</div>'
-            '<div class="mt-4"><a href="/settings" class="px-3 py-1.5 rounded bg-emerald-600 text-white">Go to Settings</a></div>'
-            '</div>'
-        )
-        return HTMLResponse(html)
+        return HTMLResponse(_HTML_SIGNED_IN)
     except KeyError:
         # Common case: access_token missing if Azure app isn't permitted for Minecraft API (or not public client)
-        try:
-            print("[Auth] Callback access_token missing; ensure Azure app is public client and approved for Minecraft API.")
-        except Exception:
-            pass
+        logger.warning("[Auth] Callback access_token missing; ensure Azure app is public client and approved for Minecraft API.")
         msg = (
             "Your Azure application could not obtain an access token. "
             f"Ensure it is configured as a Public client with redirect http://localhost:{settings.app_port}/auth/callback "
@@ -1556,68 +2163,47 @@ async def auth_callback(request: Request):
         )
     except Exception as e:
         # Log server-side for diagnostics
-        try:
-            print("[Auth] Callback error:", repr(e))
-            if settings.dev_mode:
-                print("[Auth] Stored state:", AUTH_FLOW)
-                print("[Auth] Callback params:", dict(request.query_params))
-        except Exception:
-            pass
-        return HTMLResponse(f'<div class="text-rose-400 p-4">Login failed: {e}<div class="mt-3"><a class="underline" href="/auth/login">Try again</a></div></div>', status_code=400)
+        logger.warning("[Auth] Callback error: %r", e)
+        if settings.dev_mode:
+            logger.warning("[Auth] Pending login flows: %d", len(AUTH_FLOWS))
+            logger.warning("[Auth] Callback params: %s", dict(request.query_params))
+        return HTMLResponse(f'<div class="text-rose-400 p-4">Login failed: {escape(str(e))}<div class="mt-3"><a class="underline" href="/auth/login">Try again</a></div></div>', status_code=400)
+
+# The auth endpoints below are plain `def` because _auth_status can block on a
+# Microsoft token refresh (or wait for one in flight); FastAPI runs them on its threadpool
 
 @router.get("/auth/status")
-async def auth_status():
+def auth_status():
     settings = get_settings()
     status = _auth_status(settings)
-    return JSONResponse(status)
+    return ORJSONResponse(status)
 
 @router.post("/auth/logout", response_class=HTMLResponse)
-async def auth_logout():
+def auth_logout():
     settings = get_settings()
     _delete_auth_payload()
     status = _auth_status(settings)
     return HTMLResponse(_render_account_card_html(status))
 
 @router.get("/auth/banner", response_class=HTMLResponse)
-async def auth_banner():
+def auth_banner():
     settings = get_settings()
     status = _auth_status(settings)
     if status.get("logged_in"):
-        return HTMLResponse("")
+        return _EMPTY_HTML_RESPONSE
     # Dismissible top banner
-    html = (
-        '<div class="bg-amber-500/20 border-b border-amber-600/40 text-amber-200 text-sm">'
-        '<div class="max-w-7xl mx-auto px-4 py-2 flex items-center justify-between">'
-        '<div>Not signed in. Some features may be limited. Please sign in with your Microsoft account.</div>'
-        '<a href="/auth/login" class="px-2.5 py-1 rounded bg-amber-600 hover:bg-amber-500 text-white">Sign in</a>'
-        '</div>'
-        '</div>'
-    )
-    return HTMLResponse(html)
+    return HTMLResponse(_HTML_AUTH_BANNER)
 
 @router.get("/auth/popup", response_class=HTMLResponse)
-async def auth_popup():
+def auth_popup():
     settings = get_settings()
     status = _auth_status(settings)
     if status.get("logged_in"):
-        return HTMLResponse("")
-    html = (
-        '<div class="fixed inset-0 z-50 flex items-center justify-center">'
-        '  <div class="absolute inset-0 bg-black/60" onclick="this.parentElement.remove()"></div>'
-        '  <div class="relative bg-slate-800 border border-slate-700 rounded-lg p-5 w-[28rem] shadow-xl">'
-        '    <div class="text-lg font-semibold">Sign in required</div>'
-        '    <div class="mt-2 text-sm text-slate-300">To download and launch modpacks, please sign in with your Microsoft account that owns Minecraft.</div>'
-        '    <div class="mt-4 flex items-center justify-end gap-2">'
-        '      <button class="text-xs px-2 py-1 rounded border border-slate-600 hover:bg-slate-700" onclick="document.getElementById(\'auth-modal\').remove()">Later</button>'
-        '      <a href="/auth/login" class="px-3 py-1.5 rounded bg-emerald-600 hover:bg-emerald-500 text-white">Sign in</a>'
-        '    </div>'
-        '  </div>'
-        '</div>'
-    )
-    return HTMLResponse(html)
+        return _EMPTY_HTML_RESPONSE
+    return HTMLResponse(_HTML_AUTH_POPUP)
 
 @router.get("/settings/account-panel", response_class=HTMLResponse)
-async def settings_account_panel():
+def settings_account_panel():
     settings = get_settings()
     status = _auth_status(settings)
     return HTMLResponse(_render_account_card_html(status))
@@ -1,13 +1,36 @@
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import mimetypes
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, Response
 from fastapi.staticfiles import StaticFiles
 from app.config import get_settings
-from app.api.routes import router as ui_router
+from app.api.routes import router as ui_router, shutdown_job_pools, warm_auth
+from app.services.http_cache import etag_matches
+from app.services.modrinth import ModrinthClient
 import sys
 
 settings = get_settings()
 
-app = FastAPI(title="Cottage Launcher")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One Modrinth client (and connection pool) for the lifetime of the app
+    async with ModrinthClient(user_agent=settings.modrinth_user_agent) as client:
+        app.state.modrinth = client
+        # Warm auth in the background; it may call out to Microsoft, so don't block startup
+        warmup = asyncio.create_task(asyncio.to_thread(warm_auth))
+        yield
+        await asyncio.gather(warmup, return_exceptions=True)
+    shutdown_job_pools()
+
+
+app = FastAPI(title="Cottage Launcher", lifespan=lifespan)
+# Small fragments aren't worth the CPU; the middleware adds Vary: Accept-Encoding when it compresses
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
 # Resolve base directory for static/templates.
 # When frozen by PyInstaller, data files are unpacked under sys._MEIPASS/app
@@ -23,7 +46,41 @@ TEMPLATES_DIR = BASE_DIR / "templates"
 STATIC_DIR.mkdir(parents=True, exist_ok=True)
 TEMPLATES_DIR.mkdir(parents=True, exist_ok=True)
 
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+
+
+def _load_static(root: Path) -> dict[str, tuple[bytes, str, str]]:
+    """Read every static asset once: relative path -> (body, media type, ETag)."""
+    files = {}
+    for path in root.rglob("*"):
+        if not path.is_file():
+            continue
+        rel = path.relative_to(root).as_posix()
+        body = path.read_bytes()
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        files[rel] = (body, mimetypes.guess_type(rel)[0] or "application/octet-stream", etag)
+    return files
+
+
+if settings.dev_mode:
+    # Pick up edits without a restart
+    app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+else:
+    # Assets ship with the build and never change while it runs, so serve them
+    # from memory instead of a stat + open per hit
+    STATIC_FILES = _load_static(STATIC_DIR)
+
+    @app.api_route("/static/{path:path}", methods=["GET", "HEAD"], name="static", include_in_schema=False)
+    async def static_file(request: Request, path: str):
+        hit = STATIC_FILES.get(path)
+        if hit is None:
+            # Same response StaticFiles gives for a missing file
+            return PlainTextResponse("Not Found", status_code=404)
+        body, media_type, etag = hit
+        # Paths aren't fingerprinted, so revalidate rather than cache blindly across upgrades
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
 
 # Include UI + API routes
 app.include_router(ui_router)
@@ -0,0 +1,70 @@
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+import asyncio
+import time
+
+
+class TTLCache:
+    """Small in-process cache for async lookups with per-entry expiry.
+
+    Concurrent misses for the same key are coalesced: one caller runs the
+    factory while the others wait on a per-key lock and reuse its result.
+    A key's lock only lives while someone holds or waits on it.
+    """
+
+    def __init__(self, maxsize: int = 1024) -> None:
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        # key -> [lock, number of callers holding or waiting on it]
+        self._locks: Dict[Hashable, List[Any]] = {}
+
+    def _get(self, key: Hashable) -> Tuple[bool, Any]:
+        hit = self._data.get(key)
+        if hit is None:
+            return False, None
+        expires, value = hit
+        if expires <= time.monotonic():
+            return False, None
+        return True, value
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for k in [k for k, (expires, _) in self._data.items() if expires <= now]:
+            self._data.pop(k, None)
+        # Still full: drop the oldest entries (dicts keep insertion order)
+        while len(self._data) >= self.maxsize:
+            k = next(iter(self._data))
+            self._data.pop(k, None)
+
+    async def get_or_set(
+        self,
+        key: Hashable,
+        coro_factory: Callable[[], Awaitable[Any]],
+        ttl: float,
+    ) -> Any:
+        found, value = self._get(key)
+        if found:
+            return value
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                # Another waiter may have filled the entry while we were queued
+                found, value = self._get(key)
+                if found:
+                    return value
+                value = await coro_factory()
+                if len(self._data) >= self.maxsize:
+                    self._evict()
+                self._data[key] = (time.monotonic() + ttl, value)
+                return value
+        finally:
+            # Drop the lock with its last user, even when the factory raised
+            entry[1] -= 1
+            if not entry[1] and self._locks.get(key) is entry:
+                del self._locks[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._locks.clear()
@@ -1,17 +1,49 @@
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
 import httpx
-import json
+import orjson
+
+from app.services.cache import TTLCache
+
+# HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to HTTP/1.1 without it
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    HTTP2_AVAILABLE = False
 
 
 class ModrinthClient:
     base_url = "https://api.modrinth.com/v2"
+    discover_modpack_facets = [["project_type:modpack"]]
 
-    def __init__(self, user_agent: str = "CottageLauncher/0.1") -> None:
+    def __init__(
+        self,
+        user_agent: str = "CottageLauncher/0.1",
+        cache: Optional[TTLCache] = None,
+        cache_ttl: float = 300.0,
+        search_cache_ttl: float = 60.0,
+        discover_cache_ttl: float = 900.0,
+    ) -> None:
         headers = {
             "User-Agent": user_agent,
             "Accept": "application/json",
         }
-        self._client = httpx.AsyncClient(base_url=self.base_url, headers=headers, timeout=20.0)
+        # One instance is shared by every request, so cap its pool explicitly.
+        # Over HTTP/2 concurrent calls multiplex on one connection; httpx also
+        # advertises br alongside gzip once `brotli` is installed.
+        limits = httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=30.0)
+        timeout = httpx.Timeout(20.0, connect=5.0)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url, headers=headers, timeout=timeout, limits=limits, http2=HTTP2_AVAILABLE
+        )
+        # Project metadata changes rarely; cached values are shared, so callers must not mutate them
+        self._cache = cache if cache is not None else TTLCache(maxsize=2048)
+        self.cache_ttl = cache_ttl
+        self.search_cache_ttl = search_cache_ttl
+        self.discover_cache_ttl = discover_cache_ttl
+        # (path, params) -> (ETag, body) of the last 200, for conditional refetches once a TTL lapses
+        self._validators: Dict[Hashable, Tuple[str, Any]] = {}
 
     async def __aenter__(self):
         return self
@@ -26,31 +58,88 @@ class ModrinthClient:
         self,
         query: str = "",
         limit: int = 24,
-        facets: Optional[List[List[str]]] = None,
+        facets: Optional[Sequence[Sequence[str]]] = None,
         index: Optional[str] = None,
+        ttl: Optional[float] = None,
     ) -> List[Dict[str, Any]]:
-        params: Dict[str, Any] = {"query": query or "", "limit": limit}
-        if facets:
-            # Modrinth expects a JSON-encoded array of arrays for facets
-            params["facets"] = json.dumps(facets)
+        """Search projects; equivalent queries share cached results and in-flight calls."""
+        query = query or ""
+        index = index or None
+        # Facet groups are ANDed and entries within a group ORed, so order is irrelevant
+        facets_key = tuple(sorted(tuple(sorted(group)) for group in facets or ()))
+        params: Dict[str, Any] = {"query": query, "limit": limit}
+        if facets_key:
+            # Modrinth expects a JSON-encoded array of arrays for facets; send the
+            # normalized form so equivalent queries are also identical upstream
+            params["facets"] = orjson.dumps(facets_key).decode()
         if index:
             params["index"] = index
-        r = await self._client.get("/search", params=params)
+
+        async def _fetch() -> List[Dict[str, Any]]:
+            data = await self._get_json("/search", params)
+            return data.get("hits", [])
+
+        return await self._cache.get_or_set(
+            ("search", query, facets_key, index, limit),
+            _fetch,
+            ttl=self.search_cache_ttl if ttl is None else ttl,
+        )
+
+    async def _get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        key = (path, tuple(sorted(params.items())) if params else None)
+        known = self._validators.get(key)
+        headers = {"If-None-Match": known[0]} if known else None
+        r = await self._client.get(path, params=params, headers=headers)
+        if r.status_code == 304 and known:
+            return known[1]
         r.raise_for_status()
-        data = r.json()
-        return data.get("hits", [])
+        data = orjson.loads(r.content)
+        etag = r.headers.get("ETag")
+        if etag:
+            if len(self._validators) >= self._cache.maxsize:
+                self._validators.pop(next(iter(self._validators)))
+            self._validators[key] = (etag, data)
+        return data
 
     async def get_project(self, id_or_slug: str) -> Dict[str, Any]:
-        r = await self._client.get(f"/project/{id_or_slug}")
-        r.raise_for_status()
-        return r.json()
+        return await self._cache.get_or_set(
+            ("project", id_or_slug), lambda: self._get_json(f"/project/{id_or_slug}"), ttl=self.cache_ttl
+        )
 
-    async def get_project_versions(self, id_or_slug: str) -> List[Dict[str, Any]]:
-        r = await self._client.get(f"/project/{id_or_slug}/version")
-        r.raise_for_status()
-        return r.json()
+    async def get_project_versions(
+        self,
+        id_or_slug: str,
+        loaders: Optional[Sequence[str]] = None,
+        game_versions: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """List a project's versions, newest first.
+
+        `loaders` / `game_versions` are filtered server-side, which keeps the
+        response to the few compatible versions instead of every file manifest.
+        """
+        loaders_key = tuple(sorted(loaders or ()))
+        games_key = tuple(sorted(game_versions or ()))
+        params: Dict[str, Any] = {}
+        if loaders_key:
+            params["loaders"] = orjson.dumps(loaders_key).decode()
+        if games_key:
+            params["game_versions"] = orjson.dumps(games_key).decode()
+        return await self._cache.get_or_set(
+            ("versions", id_or_slug, loaders_key, games_key),
+            lambda: self._get_json(f"/project/{id_or_slug}/version", params or None),
+            ttl=self.cache_ttl,
+        )
+
+    async def download_file(self, url: str, dest: Path, chunk_size: int = 1 << 20) -> None:
+        """Stream a file (typically from the Modrinth CDN) to `dest` over the shared pool."""
+        async with self._client.stream("GET", url, follow_redirects=True, timeout=120.0) as r:
+            r.raise_for_status()
+            with dest.open("wb") as f:
+                async for chunk in r.aiter_bytes(chunk_size):
+                    f.write(chunk)
 
     async def discover_modpacks(self, limit: int = 12, index: str = "downloads") -> List[Dict[str, Any]]:
         """Return a list of popular modpacks for discovery surfaces."""
-        facets = [["project_type:modpack"]]
-        return await self.search_projects(query="", limit=limit, facets=facets, index=index)
+        return await self.search_projects(
+            query="", limit=limit, facets=self.discover_modpack_facets, index=index, ttl=self.discover_cache_ttl
+        )
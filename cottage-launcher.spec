@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('app/templates', 'app/templates'), ('app/static', 'app/static')],
-    hiddenimports=[],
+    hiddenimports=['uvloop', 'httptools', 'uvicorn.loops.uvloop', 'uvicorn.protocols.http.httptools_impl'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
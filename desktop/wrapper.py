@@ -1,7 +1,7 @@
 # Cottage Launcher desktop wrapper (Electron-only)
 
+import asyncio
 import threading
-import time
 import webbrowser
 import os
 import httpx
@@ -11,6 +11,7 @@ from pathlib import Path
 import uvicorn
 import subprocess
 import socket
+from urllib.parse import urlsplit
 
 # Ensure project root is on sys.path when running this file directly
 ROOT_DIR = Path(__file__).resolve().parents[1]
@@ -21,36 +22,86 @@ from app.config import get_settings
 from app.main import app as fastapi_app
 
 
+# Prefer the C event loop and HTTP parser; uvloop has no Windows build
+try:
+    import uvloop  # noqa: F401
+    SERVER_LOOP = "uvloop"
+except ImportError:
+    SERVER_LOOP = "asyncio"
+try:
+    import httptools  # noqa: F401
+    SERVER_HTTP = "httptools"
+except ImportError:
+    SERVER_HTTP = "h11"
+
+
 def run_server(host: str, port: int):
     uvicorn.run(
         fastapi_app,
         host=host,
         port=port,
         log_level="info",
+        # The UI polls job/auth endpoints constantly; per-request access lines are noise
+        access_log=False,
+        loop=SERVER_LOOP,
+        http=SERVER_HTTP,
         # Reload cannot run in a background thread (uses OS signals). Must be False.
         reload=False,
     )
 
 
 def find_free_port(host: str) -> int:
-    """Bind to port 0 on the given host to obtain an available ephemeral port."""
+    """Bind to port 0 on the given host to obtain an available ephemeral port.
+
+    The probe socket is closed before uvicorn binds, so another process can still
+    grab the port in between; callers only get a port that was free just now.
+    """
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        # Only lets the port be rebound while a previous socket on it sits in
+        # TIME_WAIT; it does not reserve the port or prevent collisions
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         s.bind((host, 0))
         return s.getsockname()[1]
 
 
-def launch_electron_app(url: str, electron_dir: Path) -> int:
+async def wait_ready(url: str, timeout: float = 15.0) -> bool:
+    """Wait until `url` answers /healthz, probing the TCP port first with exponential backoff.
+
+    Failed probes are a bare connect() rather than a full HTTP request, so the
+    loop can poll tightly while the server is still starting.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or "127.0.0.1"
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.02
+    async with httpx.AsyncClient(timeout=0.75) as client:
+        while loop.time() < deadline:
+            try:
+                infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+                family, type_, proto, _, addr = infos[0]
+                with socket.socket(family, type_, proto) as s:
+                    s.setblocking(False)
+                    await loop.sock_connect(s, addr)
+                r = await client.get(f"{url}/healthz")
+                if r.status_code == 200:
+                    return True
+            except Exception:
+                pass
+            await asyncio.sleep(delay)
+            delay = min(0.2, delay * 1.5)
+    return False
+
+
+def launch_electron_app(url: str, electron_dir: Path, settings) -> int:
     """
     Launch an Electron app located at `electron_dir`, passing the backend URL via BACKEND_URL env.
     Prefers `npm start` if package.json is present, otherwise tries `npx electron .`.
     Returns the Electron process exit code, or -1 on failure to spawn.
     """
-    env = os.environ.copy()
-    env["BACKEND_URL"] = url
-
     # Pass DEV_MODE from .env to Electron
-    settings = get_settings()
-    env["DEV_MODE"] = str(settings.dev_mode).lower()
+    env = {**os.environ, "BACKEND_URL": url, "DEV_MODE": str(settings.dev_mode).lower()}
 
     package_json = electron_dir / "package.json"
     try:
@@ -94,25 +145,20 @@ def main():
     sys_url = args.url or f"http://{args.host}:{selected_port}"
 
     # Wait for server to be reachable
-    start = time.time()
-    while time.time() - start < 15:
-        try:
-            r = httpx.get(f"{sys_url}/healthz", timeout=0.75)
-            if r.status_code == 200:
-                break
-        except Exception:
-            pass
-        time.sleep(0.25)
+    if not asyncio.run(wait_ready(sys_url)):
+        print(f"[Wrapper] Server at {sys_url} did not become ready; continuing anyway.")
 
     # Launch Electron or fallback to system browser
     if args.frontend == "electron":
         # Prefer packaged Electron binary if provided
         if args.electron_binary:
             try:
-                env = os.environ.copy()
-                env["BACKEND_URL"] = sys_url
-                env["DEV_MODE"] = str(settings.dev_mode).lower()
-                env["ELECTRON_DISABLE_SANDBOX"] = "1"
+                env = {
+                    **os.environ,
+                    "BACKEND_URL": sys_url,
+                    "DEV_MODE": str(settings.dev_mode).lower(),
+                    "ELECTRON_DISABLE_SANDBOX": "1",
+                }
                 print(f"[Wrapper] Launching packaged Electron binary: {args.electron_binary} with URL {sys_url} (DEV_MODE={env['DEV_MODE']})")
                 code = subprocess.Popen([args.electron_binary], env=env).wait()
                 sys.exit(code if isinstance(code, int) else 0)
@@ -120,7 +166,7 @@ def main():
                 print(f"[Wrapper] Failed to launch packaged Electron binary: {e}. Falling back to development Electron.")
         electron_dir = Path(args.electron_dir)
         if electron_dir.exists():
-            code = launch_electron_app(sys_url, electron_dir)
+            code = launch_electron_app(sys_url, electron_dir, settings)
             if code == 0:
                 sys.exit(0)
             else:
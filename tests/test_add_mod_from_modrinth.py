@@ -0,0 +1,93 @@
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# The app creates its data dirs under ~ at import time; keep them out of the real home
+os.environ["HOME"] = tempfile.mkdtemp(prefix="cottage-test-home-")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import orjson  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.api import routes  # noqa: E402
+from app.main import app  # noqa: E402
+
+
+class FakeModrinth:
+    def __init__(self, filtered, unfiltered):
+        self.filtered = filtered
+        self.unfiltered = unfiltered
+        self.version_calls = []
+        self.downloads = []
+
+    async def get_project_versions(self, id_or_slug, loaders=None, game_versions=None):
+        self.version_calls.append((id_or_slug, loaders, game_versions))
+        return self.filtered if (loaders or game_versions) else self.unfiltered
+
+    async def download_file(self, url, dest, chunk_size=1 << 20):
+        self.downloads.append((url, dest))
+        dest.write_bytes(b"jar")
+
+
+def _version(filename):
+    return {"files": [{"url": f"https://cdn.example/{filename}", "filename": filename}]}
+
+
+class AddModFromModrinthTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        instances = Path(tmp.name)
+        patcher = mock.patch.object(routes, "INSTANCES_DIR", instances)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.inst_dir = instances / "pack"
+        self.inst_dir.mkdir()
+        self.addCleanup(app.dependency_overrides.clear)
+        # No `with`: skip the lifespan so no real Modrinth client is created
+        self.http = TestClient(app)
+
+    def _post(self, client):
+        app.dependency_overrides[routes.get_modrinth] = lambda: client
+        return self.http.post("/api/instances/pack/mods/add_modrinth", data={"id_or_slug": "sodium"})
+
+    def test_filters_by_instance_loader_and_version(self):
+        index = {"dependencies": {"minecraft": "1.20.1", "fabric-loader": "0.15.0"}}
+        (self.inst_dir / "modrinth.index.json").write_bytes(orjson.dumps(index))
+        client = FakeModrinth([_version("sodium-fabric.jar")], [_version("sodium-latest.jar")])
+
+        r = self._post(client)
+
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("Mod added", r.text)
+        self.assertEqual(client.version_calls, [("sodium", ["fabric"], ["1.20.1"])])
+        self.assertTrue((self.inst_dir / "mods" / "sodium-fabric.jar").exists())
+
+    def test_falls_back_to_unfiltered_versions(self):
+        index = {"dependencies": {"minecraft": "1.20.1", "neoforge": "20.4.1"}}
+        (self.inst_dir / "modrinth.index.json").write_bytes(orjson.dumps(index))
+        client = FakeModrinth([], [_version("sodium-latest.jar")])
+
+        r = self._post(client)
+
+        self.assertIn("Mod added", r.text)
+        self.assertEqual(
+            client.version_calls,
+            [("sodium", ["neoforge"], ["1.20.1"]), ("sodium", None, None)],
+        )
+        self.assertTrue((self.inst_dir / "mods" / "sodium-latest.jar").exists())
+
+    def test_missing_index_requests_unfiltered(self):
+        client = FakeModrinth([], [_version("sodium-latest.jar")])
+
+        r = self._post(client)
+
+        self.assertIn("Mod added", r.text)
+        self.assertEqual(client.version_calls, [("sodium", None, None)])
+
+
+if __name__ == "__main__":
+    unittest.main()
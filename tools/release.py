@@ -15,6 +15,11 @@ Options:
   --skip-backend         Skip building the backend binary
   --output-dir DIR       Directory to place final release artifacts (default: release/)
   --version VERSION      Override version (default read from desktop/electron/package.json)
+  --blake3               Also write blake3sums.txt (needs the `blake3` package)
+  --no-cache             Rebuild even if the sources and installed toolchains match a cached build
+  --force-clean          Discard PyInstaller's incremental build cache (build/); implies --no-cache
+  --keep-bundle-dir      Also write the unpacked bundle under --output-dir (the tarball is always built)
+  --compress {gzip,zstd} Tarball compression (default: gzip; zstd needs the `zstandard` package)
 
 Requirements:
   - Linux (this script exits on non-Linux)
@@ -25,82 +30,270 @@ Requirements:
 from __future__ import annotations
 
 import argparse
+import gzip
+import io
 import json
+import mmap
 import os
 import shutil
 import stat
 import subprocess
 import sys
+import tarfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Mapping
+from functools import lru_cache, partial
 from pathlib import Path
 import hashlib
+import importlib.metadata
 import platform
 
+try:
+    from blake3 import blake3  # optional: pip install blake3
+except ImportError:
+    blake3 = None
+try:
+    import zstandard  # optional: pip install zstandard
+except ImportError:
+    zstandard = None
+
 ROOT = Path(__file__).resolve().parents[1]
 ELECTRON_DIR = ROOT / "desktop" / "electron"
 DIST_DIR = ROOT / "dist"
 BUILD_DIR = ROOT / "build"
 RELEASE_DIR = ROOT / "release"
-
-
-def run(cmd: list[str], cwd: Path | None = None, env: dict | None = None) -> None:
-    print(f"[release] $ {' '.join(cmd)} (cwd={cwd or Path.cwd()})")
-    subprocess.check_call(cmd, cwd=str(cwd) if cwd else None, env=env or os.environ.copy())
+# Read size when hashing large artifacts (AppImage, backend binary)
+_HASH_BUF = 1 << 20
+# Files at least this big are hashed through mmap instead
+_MMAP_MIN = 8 << 20
+# Successful builds, keyed by a hash of their inputs (see _cached_build)
+BUILD_CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "cottage-launcher" / "build"
+# Cached builds kept per kind; each is a full binary/AppImage, so older keys are evicted
+BUILD_CACHE_KEEP = 3
+# release.py itself is an input to the backend build: it holds the PyInstaller command line
+BACKEND_SOURCES = [
+    ROOT / "app",
+    ROOT / "desktop" / "__init__.py",
+    ROOT / "desktop" / "wrapper.py",
+    ROOT / "requirements.txt",
+    Path(__file__).resolve(),
+]
+ELECTRON_SOURCES = [ELECTRON_DIR / "main.js", ELECTRON_DIR / "package.json"]
+
+
+# Tools resolved once up front rather than by PATH search on every spawn
+PYTHON = sys.executable
+NPM = shutil.which("npm") or "npm"
+
+# The Electron and backend builds run side by side; keep their command echoes whole
+_PRINT_LOCK = threading.Lock()
+
+
+def run(cmd: list[str], cwd: Path | None = None, env: Mapping[str, str] | None = None) -> None:
+    with _PRINT_LOCK:
+        print(f"[release] $ {' '.join(cmd)} (cwd={cwd or Path.cwd()})")
+    # env=None inherits os.environ; subprocess builds the child's environment itself
+    subprocess.check_call(cmd, cwd=str(cwd) if cwd else None, env=env)
+
+
+@lru_cache(maxsize=None)
+def _has_pyinstaller() -> bool:
+    try:
+        import PyInstaller  # noqa: F401
+        return True
+    except Exception:
+        return False
 
 
 def ensure_pyinstaller() -> None:
-    try:
-        import PyInstaller  # noqa: F401
+    if _has_pyinstaller():
         return
-    except Exception:
-        pass
     print("[release] Installing PyInstaller…")
-    run([sys.executable, "-m", "pip", "install", "pyinstaller==6.10.0"])  # pinned for reproducibility
+    run([PYTHON, "-m", "pip", "install", "pyinstaller==6.10.0"])  # pinned for reproducibility
+    _has_pyinstaller.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def load_electron_package_json() -> dict:
+    """Parsed desktop/electron/package.json, read once per run. Don't mutate the result."""
+    return json.loads((ELECTRON_DIR / "package.json").read_text("utf-8"))
 
 
 def read_version(override: str | None) -> str:
     if override:
         return override
-    pkg = ELECTRON_DIR / "package.json"
-    data = json.loads(pkg.read_text("utf-8"))
-    return data.get("version", "0.0.0")
+    return load_electron_package_json().get("version", "0.0.0")
 
 
-def build_electron_appimage() -> Path:
-    # Ensure dependencies present
-    print("[release] Building Electron AppImage…")
+def _source_files(paths: list[Path]) -> list[Path]:
+    files: list[Path] = []
+    for p in paths:
+        if p.is_file():
+            files.append(p)
+        elif p.is_dir():
+            files.extend(f for f in p.rglob("*") if f.is_file() and "__pycache__" not in f.parts)
+    return sorted(files)
+
+
+def _installed_packages() -> tuple[str, ...]:
+    """`name==version` for every distribution in this interpreter.
+
+    requirements.txt only pins ranges for some packages and PyInstaller bundles
+    whatever is installed, so the environment is a build input too.
+    """
+    pkgs = {f"{d.metadata['Name']}=={d.version}" for d in importlib.metadata.distributions() if d.metadata["Name"]}
+    return tuple(sorted(pkgs, key=str.lower))
+
+
+def _build_key(paths: list[Path], extra: tuple[str, ...] = ()) -> str:
+    """Hash the relative names and contents of every file under `paths`, plus `extra`.
+
+    Uses one multithreaded BLAKE3 tree hash when available (128 bits is plenty
+    for cache identity), otherwise a SHA-256 over per-file digests.
+    """
+    files = _source_files(paths)
+    # PyInstaller bundles the running interpreter
+    interp = "\n".join((sys.version, *extra)).encode("utf-8")
+    if blake3 is not None:
+        h = blake3(max_threads=blake3.AUTO)
+        h.update(interp)
+        for f in files:
+            with f.open("rb") as fh:
+                # Length-prefix each file so content can't bleed into the next name
+                size = os.fstat(fh.fileno()).st_size
+                h.update(f.relative_to(ROOT).as_posix().encode("utf-8") + b"\0" + size.to_bytes(8, "little"))
+                _update_from_file(h, fh)
+        return h.hexdigest(length=16)
+    h = hashlib.sha256()
+    h.update(interp)
+    for f in files:
+        h.update(f.relative_to(ROOT).as_posix().encode("utf-8") + b"\0")
+        h.update(bytes.fromhex(sha256_file(f)))
+    return h.hexdigest()
+
+
+def _sendfile_copy(src: Path, dst: Path) -> None:
+    """Copy a large regular file entirely in the kernel with os.sendfile."""
+    with src.open("rb") as fin, dst.open("wb") as fout:
+        size = os.fstat(fin.fileno()).st_size
+        sent = 0
+        try:
+            while sent < size:
+                n = os.sendfile(fout.fileno(), fin.fileno(), sent, size - sent)
+                if not n:
+                    break
+                sent += n
+        except OSError:
+            # Filesystem without sendfile support: let shutil pick a path
+            fout.seek(0)
+            fout.truncate()
+            fin.seek(0)
+            shutil.copyfileobj(fin, fout, _HASH_BUF)
+
+
+def _cached_build(
+    kind: str, sources: list[Path], build, use_cache: bool = True, extra: tuple[str, ...] = ()
+) -> Path:
+    """Return a cached artifact for unchanged `sources` and `extra`, else run `build` and cache its output."""
+    cached = BUILD_CACHE_DIR / f"{kind}-{_build_key(sources, extra)}" / kind
+    if use_cache and cached.is_file():
+        print(f"[release] Sources unchanged; reusing cached {kind} build at {cached}")
+        # Mark it recently used so pruning keeps it
+        os.utime(cached.parent)
+        return cached
+    artifact = build()
+    cached.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cached.with_name(cached.name + ".tmp")
+    _sendfile_copy(artifact, tmp)
+    os.replace(tmp, cached)
+    _prune_build_cache(kind)
+    return artifact
+
+
+def _prune_build_cache(kind: str, keep: int = BUILD_CACHE_KEEP) -> None:
+    """Delete all but the `keep` most recently used cached builds of `kind`."""
+    entries = sorted(BUILD_CACHE_DIR.glob(f"{kind}-*"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in entries[keep:]:
+        print(f"[release] Evicting cached {kind} build {stale.name}")
+        shutil.rmtree(stale, ignore_errors=True)
+
+
+def ensure_electron_deps() -> None:
     # Install node deps if needed
     node_modules = ELECTRON_DIR / "node_modules"
     if not node_modules.exists():
-        run(["npm", "install"], cwd=ELECTRON_DIR)
+        run([NPM, "install"], cwd=ELECTRON_DIR)
     # Ensure electron-builder installed
-    pkg = json.loads((ELECTRON_DIR / "package.json").read_text("utf-8"))
-    dev_deps = pkg.get("devDependencies", {})
+    dev_deps = load_electron_package_json().get("devDependencies", {})
     if "electron-builder" not in dev_deps:
-        run(["npm", "install", "-D", "electron-builder@^24.13.3"], cwd=ELECTRON_DIR)
+        run([NPM, "install", "-D", "electron-builder@^24.13.3"], cwd=ELECTRON_DIR)
+        load_electron_package_json.cache_clear()
+
+
+def _electron_toolchain() -> tuple[str, ...]:
+    """`name==version` of each npm package the Electron build depends on, as installed.
+
+    package.json only gives caret ranges, so the resolved electron/electron-builder
+    versions in node_modules are what actually produce the AppImage.
+    """
+    pkg = load_electron_package_json()
+    out = []
+    for name in sorted({**pkg.get("dependencies", {}), **pkg.get("devDependencies", {})}):
+        try:
+            meta = json.loads((ELECTRON_DIR / "node_modules" / name / "package.json").read_text("utf-8"))
+            out.append(f"{name}=={meta.get('version')}")
+        except (OSError, ValueError):
+            out.append(f"{name}==missing")
+    return tuple(out)
+
+
+def cached_electron_appimage(use_cache: bool = True) -> Path:
+    """Install the npm toolchain first so the cache key sees the resolved versions."""
+    ensure_electron_deps()
+    return _cached_build("appimage", ELECTRON_SOURCES, build_electron_appimage, use_cache, _electron_toolchain())
+
+
+def build_electron_appimage() -> Path:
+    print("[release] Building Electron AppImage…")
+    ensure_electron_deps()
     # Build AppImage
-    run(["npm", "run", "build:linux"], cwd=ELECTRON_DIR)
+    run([NPM, "run", "build:linux"], cwd=ELECTRON_DIR)
     dist = ELECTRON_DIR / "dist"
-    candidates = sorted(dist.glob("*.AppImage"), key=lambda p: p.stat().st_mtime, reverse=True)
-    if not candidates:
-        raise RuntimeError("electron-builder did not produce an AppImage in desktop/electron/dist/")
-    return candidates[0]
+    try:
+        return max(dist.glob("*.AppImage"), key=lambda p: p.stat().st_mtime)
+    except ValueError:
+        raise RuntimeError("electron-builder did not produce an AppImage in desktop/electron/dist/") from None
 
 
-def build_backend_binary() -> Path:
+# Optional fast server stack used by desktop/wrapper.py; keep in sync with cottage-launcher.spec
+UVICORN_FAST_IMPORTS = (
+    "uvloop",
+    "httptools",
+    "uvicorn.loops.uvloop",
+    "uvicorn.protocols.http.httptools_impl",
+)
+
+
+def build_backend_binary(clean: bool = False) -> Path:
     print("[release] Building backend wrapper binary with PyInstaller…")
     ensure_pyinstaller()
-    # Clean old builds to avoid confusion
-    if DIST_DIR.exists():
-        shutil.rmtree(DIST_DIR)
-    if BUILD_DIR.exists():
-        shutil.rmtree(BUILD_DIR)
+    # Keep build/ between runs: PyInstaller reuses its analysis there, and
+    # --noconfirm overwrites the previous dist/ output in place
+    BUILD_DIR.mkdir(parents=True, exist_ok=True)
     # Package desktop/wrapper.py as single binary and include templates/static
     cmd = [
-        sys.executable,
+        PYTHON,
         "-m",
         "PyInstaller",
         "--noconfirm",
-        "--clean",
+        *(["--clean"] if clean else []),
+        "--distpath",
+        str(DIST_DIR),
+        "--workpath",
+        str(BUILD_DIR),
         "--onefile",
         "--name",
         "cottage-launcher",
@@ -108,6 +301,8 @@ def build_backend_binary() -> Path:
         f"app/templates{os.pathsep}app/templates",
         "--add-data",
         f"app/static{os.pathsep}app/static",
+        # uvicorn picks its loop/protocol by name at runtime, so analysis can't see them
+        *(arg for mod in UVICORN_FAST_IMPORTS for arg in ("--hidden-import", mod)),
         str(ROOT / "desktop" / "wrapper.py"),
     ]
     run(cmd, cwd=ROOT)
@@ -120,10 +315,19 @@ def build_backend_binary() -> Path:
     return exe
 
 
-def write_launcher_script(dst_dir: Path, appimage_name: str) -> Path:
-    script = dst_dir / "run.sh"
-    script.write_text(
-        f"""#!/usr/bin/env bash
+def _write_file(path: Path, payload: bytes, mode: int) -> None:
+    """Write `payload` with permissions `mode` set from the start (no separate chmod pass)."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    try:
+        # O_CREAT's mode only applies to new files
+        os.fchmod(fd, mode)
+        os.write(fd, payload)
+    finally:
+        os.close(fd)
+
+
+def launcher_script(appimage_name: str) -> bytes:
+    return f"""#!/usr/bin/env bash
 set -euo pipefail
 DIR="$(cd "$(dirname "${{BASH_SOURCE[0]}}")" && pwd)"
 # Ensure binaries are executable
@@ -131,77 +335,193 @@ chmod +x "$DIR/cottage-launcher" || true
 chmod +x "$DIR/{appimage_name}" || true
 # Launch backend + Electron
 "$DIR/cottage-launcher" --electron-binary "$DIR/{appimage_name}"
-""",
-        encoding="utf-8",
-    )
-    script.chmod(script.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
-    return script
+""".encode("utf-8")
 
 
-def write_release_readme(dst_dir: Path, version: str) -> Path:
-    """Write a README into the release directory with launch instructions.
+def release_readme(version: str) -> bytes:
+    """README for the release bundle with launch instructions.
 
     Explains that the AppImage (Electron frontend) and the backend executable are
     not independent and must be launched together via the provided run.sh script.
     """
-    readme = dst_dir / "README.txt"
-    readme.write_text(
-        (
-            "Cottage Launcher\n"
-            f"Version: {version}\n\n"
-            "This directory contains the Linux release bundle.\n\n"
-            "Contents:\n"
-            "  - run.sh                 -> Start the backend and the Electron AppImage together (recommended)\n"
-            "  - cottage-launcher       -> Backend server wrapper only (FastAPI + Uvicorn)\n"
-            "  - CottageLauncher-<ver>.AppImage -> Electron frontend only\n\n"
-            "How to run (recommended):\n"
-            "  1) Double-click or execute ./run.sh\n"
-            "     This starts the backend and launches the Electron AppImage with the correct\n"
-            "     environment so the frontend can talk to the backend.\n\n"
-            "Important:\n"
-            "  - The AppImage and backend are NOT independent.\n"
-            "    Running the AppImage directly usually will not work, because it expects\n"
-            "    the BACKEND_URL environment to be set by run.sh.\n"
-            "  - Running the backend (cottage-launcher) alone only starts the local web server;\n"
-            "    it does not include the desktop UI unless you open the URL in a browser yourself.\n\n"
-            "Advanced usage (optional):\n"
-            "  - To use a system browser instead of Electron: ./cottage-launcher --frontend browser\n"
-            "  - To point the AppImage to an already-running backend: set BACKEND_URL, e.g.\n"
-            "      BACKEND_URL=http://127.0.0.1:8000 ./CottageLauncher-<ver>.AppImage\n"
-            "\n"
-            "If you encounter issues, run from a terminal to see logs.\n"
-        ),
-        encoding="utf-8",
-    )
-    return readme
+    return (
+        "Cottage Launcher\n"
+        f"Version: {version}\n\n"
+        "This directory contains the Linux release bundle.\n\n"
+        "Contents:\n"
+        "  - run.sh                 -> Start the backend and the Electron AppImage together (recommended)\n"
+        "  - cottage-launcher       -> Backend server wrapper only (FastAPI + Uvicorn)\n"
+        "  - CottageLauncher-<ver>.AppImage -> Electron frontend only\n\n"
+        "How to run (recommended):\n"
+        "  1) Double-click or execute ./run.sh\n"
+        "     This starts the backend and launches the Electron AppImage with the correct\n"
+        "     environment so the frontend can talk to the backend.\n\n"
+        "Important:\n"
+        "  - The AppImage and backend are NOT independent.\n"
+        "    Running the AppImage directly usually will not work, because it expects\n"
+        "    the BACKEND_URL environment to be set by run.sh.\n"
+        "  - Running the backend (cottage-launcher) alone only starts the local web server;\n"
+        "    it does not include the desktop UI unless you open the URL in a browser yourself.\n\n"
+        "Advanced usage (optional):\n"
+        "  - To use a system browser instead of Electron: ./cottage-launcher --frontend browser\n"
+        "  - To point the AppImage to an already-running backend: set BACKEND_URL, e.g.\n"
+        "      BACKEND_URL=http://127.0.0.1:8000 ./CottageLauncher-<ver>.AppImage\n"
+        "\n"
+        "If you encounter issues, run from a terminal to see logs.\n"
+    ).encode("utf-8")
+
+
+def _advise_sequential(f) -> None:
+    """Ask the kernel for aggressive readahead on a file read once front to back."""
+    if hasattr(os, "posix_fadvise"):
+        # Advice values aren't flags, so they go in separate calls
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+
+
+def _update_from_file(h, f) -> None:
+    """Feed an open file into hasher `h`.
+
+    Large files are mapped and passed in as one buffer, so the hasher makes a
+    single update call with no intermediate copies; small ones (where mmap setup
+    costs more than it saves) go through a reused read buffer.
+    """
+    if os.fstat(f.fileno()).st_size >= _MMAP_MIN:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            h.update(mm)
+        return
+    buf = bytearray(_HASH_BUF)
+    view = memoryview(buf)
+    while n := f.readinto(buf):
+        h.update(view[:n])
 
 
 def sha256_file(p: Path) -> str:
-    h = hashlib.sha256()
     with p.open("rb") as f:
-        for chunk in iter(lambda: f.read(8192), b""):
-            h.update(chunk)
+        _advise_sequential(f)
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+: read/update loop runs in C
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        _update_from_file(h, f)
     return h.hexdigest()
 
 
-def write_checksums(dst_dir: Path) -> Path:
-    out = dst_dir / "sha256sums.txt"
-    lines: list[str] = []
-    for p in sorted(dst_dir.iterdir()):
-        if p.is_file() and p.name != out.name:
-            lines.append(f"{sha256_file(p)}  {p.name}")
-    out.write_text("\n".join(lines) + "\n", encoding="utf-8")
-    return out
+# Checksum files written into the bundle, and the hash each one lists
+CHECKSUM_HASHERS = {
+    "sha256sums.txt": hashlib.sha256,
+    "blake3sums.txt": lambda: blake3(max_threads=blake3.AUTO),
+}
+
+
+class _HashingReader:
+    """Read-only file wrapper that feeds every chunk read through it into `hashers`."""
+
+    def __init__(self, f, hashers) -> None:
+        self._f = f
+        self._hashers = hashers
+
+    def read(self, n: int = -1) -> bytes:
+        data = self._f.read(n)
+        for h in self._hashers:
+            h.update(data)
+        return data
 
 
-def make_tarball(src_dir: Path, version: str) -> Path:
-    tar_name = f"CottageLauncher-{version}-linux-x64.tar.gz"
-    tar_path = RELEASE_DIR / tar_name
+def _checksum_listing(digests: dict[str, str]) -> bytes:
+    """`<algo>sum -c` compatible listing, sorted by file name."""
+    return "".join(f"{digests[n]}  {n}\n" for n in sorted(digests)).encode("utf-8")
+
+
+def write_bundle_dir(bundle_dir: Path, members: dict[str, tuple[Path | bytes, int]]) -> None:
+    if bundle_dir.exists():
+        shutil.rmtree(bundle_dir)
+    bundle_dir.mkdir(parents=True, exist_ok=True)
+    for name, (src, mode) in members.items():
+        dst = bundle_dir / name
+        if isinstance(src, bytes):
+            _write_file(dst, src, mode)
+        else:
+            _sendfile_copy(src, dst)
+            os.chmod(dst, mode)
+
+
+@contextmanager
+def _compressed_output(path: Path, compress: str):
+    """Yield a writable stream that compresses into `path`.
+
+    The AppImage and PyInstaller binary are already compressed, so fast settings
+    lose almost nothing in size. pigz is worth its fork/exec because it spreads
+    gzip over all cores; without it gzip runs in-process rather than as `gzip -1`.
+    """
+    with path.open("wb") as out:
+        if compress == "zstd":
+            cctx = zstandard.ZstdCompressor(level=3, threads=-1)
+            with cctx.stream_writer(out, closefd=False) as zf:
+                yield zf
+        elif pigz := shutil.which("pigz"):
+            proc = subprocess.Popen([pigz, "-1"], stdin=subprocess.PIPE, stdout=out)
+            try:
+                yield proc.stdin
+            finally:
+                proc.stdin.close()
+                if proc.wait():
+                    raise subprocess.CalledProcessError(proc.returncode, [pigz, "-1"])
+        else:
+            with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=1) as gz:
+                yield gz
+
+
+def make_tarball(
+    members: dict[str, tuple[Path | bytes, int]], version: str, sums: list[str], compress: str = "gzip"
+) -> tuple[Path, dict[str, bytes]]:
+    """Stream `members` into the release tarball straight from where they are.
+
+    Build artifacts are read in place and generated files are added from memory,
+    so nothing has to be copied into a bundle directory first. Each artifact is
+    hashed as it streams into the archive (one read per file); the checksum
+    files named in `sums` are appended last and returned as name -> payload.
+    """
+    digests: dict[str, dict[str, str]] = {name: {} for name in sums}
+    prefix = f"CottageLauncher-{version}-linux-x64"
+    tar_path = RELEASE_DIR / f"{prefix}.tar.{'zst' if compress == 'zstd' else 'gz'}"
     if not RELEASE_DIR.exists():
         RELEASE_DIR.mkdir(parents=True, exist_ok=True)
-    # Create tar.gz
-    run(["tar", "-czf", str(tar_path), "-C", str(src_dir.parent), src_dir.name])
-    return tar_path
+    with _PRINT_LOCK:
+        print(f"[release] Packing {tar_path} ({compress})")
+    now = int(time.time())
+    with _compressed_output(tar_path, compress) as out:
+        with tarfile.open(fileobj=out, mode="w|", format=tarfile.GNU_FORMAT, copybufsize=_HASH_BUF) as tf:
+            root = tarfile.TarInfo(prefix)
+            root.type = tarfile.DIRTYPE
+            root.mode = 0o755
+            root.mtime = now
+            tf.addfile(root)
+
+            def add_bytes(name: str, payload: bytes, mode: int) -> None:
+                info = tarfile.TarInfo(f"{prefix}/{name}")
+                info.size = len(payload)
+                info.mtime = now
+                info.mode = mode
+                tf.addfile(info, io.BytesIO(payload))
+
+            for name, (src, mode) in members.items():
+                hashers = {sums_name: CHECKSUM_HASHERS[sums_name]() for sums_name in sums}
+                if isinstance(src, bytes):
+                    for h in hashers.values():
+                        h.update(src)
+                    add_bytes(name, src, mode)
+                else:
+                    with src.open("rb") as f:
+                        _advise_sequential(f)
+                        info = tf.gettarinfo(arcname=f"{prefix}/{name}", fileobj=f)
+                        info.mode = mode
+                        tf.addfile(info, _HashingReader(f, list(hashers.values())))
+                for sums_name, h in hashers.items():
+                    digests[sums_name][name] = h.hexdigest()
+            listings = {sums_name: _checksum_listing(digests[sums_name]) for sums_name in sums}
+            for sums_name, payload in listings.items():
+                add_bytes(sums_name, payload, 0o644)
+    return tar_path, listings
 
 
 def main() -> None:
@@ -215,58 +535,87 @@ def main() -> None:
     ap.add_argument("--skip-backend", action="store_true")
     ap.add_argument("--output-dir", default=str(RELEASE_DIR))
     ap.add_argument("--version", default=None)
+    ap.add_argument("--blake3", action="store_true", help="Also write blake3sums.txt")
+    ap.add_argument("--no-cache", action="store_true", help="Ignore cached builds")
+    ap.add_argument("--force-clean", action="store_true", help="Run PyInstaller with --clean; implies --no-cache")
+    ap.add_argument("--keep-bundle-dir", action="store_true", help="Also write the unpacked bundle directory")
+    ap.add_argument("--compress", choices=["gzip", "zstd"], default="gzip", help="Tarball compression")
     args = ap.parse_args()
+    if args.blake3 and blake3 is None:
+        print("[release] --blake3 needs the blake3 package (pip install blake3). Aborting.")
+        sys.exit(2)
+    if args.compress == "zstd" and zstandard is None:
+        print("[release] --compress zstd needs the zstandard package (pip install zstandard). Aborting.")
+        sys.exit(2)
 
     version = read_version(args.version)
     print(f"[release] Version: {version}")
-
-    appimage_path: Path | None = None
-    if not args.skip_electron:
-        appimage_path = build_electron_appimage()
-    else:
-        print("[release] Skipping Electron build as requested")
-
-    backend_bin: Path | None = None
-    if not args.skip_backend:
-        backend_bin = build_backend_binary()
-    else:
-        print("[release] Skipping backend build as requested")
-
-    # Assemble release directory
-    out_root = Path(args.output_dir)
-    out_root.mkdir(parents=True, exist_ok=True)
-    bundle_dir = out_root / f"CottageLauncher-{version}-linux-x64"
-    if bundle_dir.exists():
-        shutil.rmtree(bundle_dir)
-    bundle_dir.mkdir(parents=True, exist_ok=True)
-
-    # Copy artifacts
+    # A clean build is pointless if a cached artifact short-circuits it
+    use_cache = not (args.no_cache or args.force_clean)
+
+    # npm/electron-builder and PyInstaller use separate trees and toolchains, so build both at once
+    with ThreadPoolExecutor(max_workers=2) as ex:
+        appimage_future = None
+        if not args.skip_electron:
+            appimage_future = ex.submit(cached_electron_appimage, use_cache)
+        else:
+            print("[release] Skipping Electron build as requested")
+
+        backend_future = None
+        if not args.skip_backend:
+            backend_future = ex.submit(
+                _cached_build,
+                "backend",
+                BACKEND_SOURCES,
+                partial(build_backend_binary, clean=args.force_clean),
+                use_cache,
+                _installed_packages(),
+            )
+        else:
+            print("[release] Skipping backend build as requested")
+
+        appimage_path: Path | None = appimage_future.result() if appimage_future else None
+        backend_bin: Path | None = backend_future.result() if backend_future else None
+
+    # Bundle contents: name -> (build output or generated payload, mode).
+    # Artifacts stay where the builds left them.
+    members: dict[str, tuple[Path | bytes, int]] = {}
     appimage_name = None
     if appimage_path:
         appimage_name = f"CottageLauncher-{version}.AppImage"
-        shutil.copy2(appimage_path, bundle_dir / appimage_name)
+        members[appimage_name] = (appimage_path, 0o755)
     if backend_bin:
-        shutil.copy2(backend_bin, bundle_dir / "cottage-launcher")
+        members["cottage-launcher"] = (backend_bin, 0o755)
 
     # Launcher script
     if appimage_name and backend_bin:
-        write_launcher_script(bundle_dir, appimage_name)
+        members["run.sh"] = (launcher_script(appimage_name), 0o755)
 
     # README with instructions about run.sh and component coupling
-    write_release_readme(bundle_dir, version)
-
-    # Checksums
-    write_checksums(bundle_dir)
-
-    # Tarball
-    tarball = make_tarball(bundle_dir, version)
+    members["README.txt"] = (release_readme(version), 0o644)
+
+    # Tarball, with checksums taken while packing (SHA-256 stays the default so
+    # `sha256sum -c` keeps working)
+    sums = ["sha256sums.txt"] + (["blake3sums.txt"] if args.blake3 else [])
+    tarball, listings = make_tarball(members, version, sums, args.compress)
+    for name, payload in listings.items():
+        members[name] = (payload, 0o644)
+
+    bundle_dir = None
+    if args.keep_bundle_dir:
+        out_root = Path(args.output_dir)
+        out_root.mkdir(parents=True, exist_ok=True)
+        bundle_dir = out_root / f"CottageLauncher-{version}-linux-x64"
+        write_bundle_dir(bundle_dir, members)
 
     print("\n[release] Done!")
-    print(f"[release] Bundle dir: {bundle_dir}")
+    if bundle_dir:
+        print(f"[release] Bundle dir: {bundle_dir}")
     print(f"[release] Tarball   : {tarball}")
     print("[release] Contents:")
-    for p in bundle_dir.iterdir():
-        print(f"  - {p.name} ({p.stat().st_size} bytes)")
+    for name, (src, _) in members.items():
+        size = len(src) if isinstance(src, bytes) else src.stat().st_size
+        print(f"  - {name} ({size} bytes)")
 
 
 if __name__ == "__main__":